@@ -37,6 +37,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'Future.profiling.QueryProfilerMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -66,13 +67,99 @@ TEMPLATES = [
 WSGI_APPLICATION = 'Canteen.wsgi.application'
 
 # Database
+# CANTEEN_DB_PROFILE selects how SQLite is tuned. 'stock' (the default) is
+# SQLite's out-of-the-box behaviour, so management commands and tests leave
+# the committed development database as it is. Deployments opt in to
+# 'production', which runs in WAL mode so readers never block the checkout
+# writer, waits on locks instead of failing, takes write locks up front
+# (IMMEDIATE) and keeps connections open between requests. PRAGMAS are
+# applied to every new connection in Future.signals.
+SQLITE_PROFILES = {
+    'stock': {
+        'OPTIONS': {},
+        'CONN_MAX_AGE': 0,
+        'PRAGMAS': {},
+    },
+    'production': {
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 10},
+        'CONN_MAX_AGE': 600,
+        'PRAGMAS': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 10000,
+            'mmap_size': 128 * 1024 * 1024,
+            'cache_size': -32000,  # KiB
+            'temp_store': 'MEMORY',
+        },
+    },
+}
+SQLITE_PROFILE = SQLITE_PROFILES[os.environ.get('CANTEEN_DB_PROFILE', 'stock')]
+SQLITE_PRAGMAS = SQLITE_PROFILE['PRAGMAS']
+
+# Set by Canteen/asgi.py. Code that only works on an async server (the
+# kitchen's live feed) checks it; runserver and WSGI deployments leave it off.
+CANTEEN_ASGI = bool(os.environ.get('CANTEEN_ASGI'))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': SQLITE_PROFILE['OPTIONS'],
+        # Under ASGI each request's sync code runs in a thread of its own, so a
+        # persistent connection would just be stranded there when it exits.
+        'CONN_MAX_AGE': 0 if CANTEEN_ASGI else SQLITE_PROFILE['CONN_MAX_AGE'],
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Caches
+# Carts and sessions live in file-based caches so every worker process on
+# the host sees the same data; cart edits never touch the database.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'carts': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'carts'),
+        'TIMEOUT': 60 * 60 * 4,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'sessions'),
+        'TIMEOUT': 60 * 60 * 24 * 14,
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    # Version stamps behind the ETag/Last-Modified headers; shared by every
+    # worker process so a bump anywhere turns stale validators into 200s.
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'versions'),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+CART_CACHE_ALIAS = 'carts'
+VERSION_CACHE_ALIAS = 'versions'
+
+# Sessions
+# CANTEEN_SESSION_ENGINE selects the session backend. 'cached_db' (the
+# default) writes through to the database but serves reads from the shared
+# 'sessions' cache; 'signed_cookies' keeps sessions out of the database
+# entirely; 'db' is Django's plain database backend.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('CANTEEN_SESSION_ENGINE', 'cached_db')]
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_SAVE_EVERY_REQUEST = False
+
+# Flash messages ride in a cookie so showing one never modifies the session.
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -14,22 +14,24 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.urls import path
+from django.urls import path, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.contrib.auth.views import LogoutView
 
-from Future import views
+from Future import api, views, images
 from Future.views import qr_scanner, export_daily_report_pdf
 
 urlpatterns = [
+    path('admin/query-profile/', admin.site.admin_view(views.query_profile), name='admin_query_profile'),
     path('admin/', admin.site.urls),
     path('home', views.home, name='home'),
     path('', qr_scanner, name='qr_scanner'),
     path('cart/', views.cart_view, name='cart'),
     path('place_order/', views.place_order, name='place_order'),
     path('order_history/', views.order_history, name='order_history'),
+    path('order_history/more/', views.order_history_more, name='order_history_more'),
     path('add-to-cart/<int:item_id>/', views.add_to_cart, name='add_to_cart'),
     path('logout/', LogoutView.as_view(next_page='qr_scanner'), name='logout'),
     path('order_success/<int:order_id>/', views.order_success, name='order_success'),
@@ -37,6 +39,23 @@ urlpatterns = [
     path('remove-from-cart/<int:item_id>/', views.remove_from_cart, name='remove_from_cart'),
     path('verify-employee/<int:employee_id>/', views.verify_employee, name='verify_employee'),
     path('delete-orders-by-date/', views.delete_orders_by_date, name='delete_orders_by_date'),
+
+    path('metrics', views.metrics_view, name='metrics'),
+    path('kitchen/feed/', views.kitchen_feed, name='kitchen_feed'),
+
+    path('api/menu/', api.menu_items, name='api_menu'),
+    path('api/pickup-slots/', api.pickup_slots, name='api_pickup_slots'),
+    path('api/cart/', api.cart_detail, name='api_cart'),
+    path('api/cart/add/<int:item_id>/', api.cart_add, name='api_cart_add'),
+    path('api/cart/remove/<int:item_id>/', api.cart_remove, name='api_cart_remove'),
+    path('api/orders/', api.place_order, name='api_place_order'),
+    path('api/wallet/', api.wallet_balance, name='api_wallet'),
+
+    re_path(
+        rf'^{settings.MEDIA_URL.lstrip("/")}{images.DERIVATIVE_DIR}/(?P<name>{images.DERIVATIVE_NAME_PATTERN})$',
+        views.photo_derivative,
+        name='photo_derivative',
+    ),
 ]
 
 if settings.DEBUG:
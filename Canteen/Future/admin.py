@@ -1,16 +1,32 @@
+from decimal import Decimal
 from datetime import datetime
+from django.conf import settings
 from django.contrib import admin
 from django.shortcuts import render
 from django.urls import path, reverse
-from django.db.models import DateField
 from django.utils.html import format_html
-from django.db.models.functions import Cast
-from django.utils.timezone import localtime
+from django.utils.timezone import localtime, localdate
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.files.storage import default_storage
-from .models import Employee, MenuItem, Order, CartItem
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Prefetch, Subquery, Sum
+from django.views.decorators.http import condition
+from . import menu, slots, images, wallet, rollups, versions
+from .models import (
+    Employee, MenuItem, Order, CartItem, OutboxEmail, PickupSlot, PickupSlotItem, WalletTransaction, DailySalesRollup,
+    WEEKDAYS, weekday_bit,
+)
 from django.http import HttpResponse, HttpResponseRedirect
 
+CENTS = Decimal('0.01')
+
+
+def menu_stamp(request, day):
+    return versions.page_stamp(request, ['menu'], extra=(day, request.user.pk))
+
+
+def day_stamp(request, date):
+    return versions.page_stamp(request, [f"orders-day:{date}"], extra=(request.user.pk,))
+
 
 @admin.register(Employee)
 class EmployeeAdmin(admin.ModelAdmin):
@@ -20,13 +36,37 @@ class EmployeeAdmin(admin.ModelAdmin):
     )
     readonly_fields = ('qr_code_preview', 'photo_preview')
 
+    def get_form(self, request, obj=None, **kwargs):
+        form = super().get_form(request, obj, **kwargs)
+        # Post back the balance the page was rendered with, so an edit is
+        # applied relative to what the admin actually saw.
+        form.base_fields['wallet_amount'].show_hidden_initial = True
+        return form
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            super().save_model(request, obj, form, change)
+            if obj.wallet_amount:
+                wallet.record(obj, obj.wallet_amount, WalletTransaction.TOPUP, note="Opening balance")
+            return
+
+        # Never write wallet_amount back from the form: that would overwrite
+        # any debit made since the page was loaded. Apply the edit as a delta.
+        fields = [f.name for f in obj._meta.concrete_fields if f.name not in ('id', 'wallet_amount')]
+        obj.save(update_fields=fields)
+        if 'wallet_amount' in form.changed_data:
+            seen = form.data.get(form.add_initial_prefix('wallet_amount'), form.initial['wallet_amount'])
+            delta = obj.wallet_amount - form.fields['wallet_amount'].to_python(seen)
+            kind = WalletTransaction.TOPUP if delta > 0 else WalletTransaction.ADJUSTMENT
+            wallet.adjust_balance(obj, delta, kind, note=f"Admin edit by {request.user}")
+
     def masked_pin(self, obj):
         return "****"
     masked_pin.short_description = 'PIN'
 
     def photo_preview(self, obj):
         if obj.photo:
-            return format_html('<img src="{}" style="height: 80px;" />', obj.photo.url)
+            return images.picture_html(obj, 'thumb', style='height: 80px; width: auto;')
         return "No Photo"
 
     def qr_code_preview(self, obj):
@@ -81,7 +121,11 @@ class MenuItemAdmin(admin.ModelAdmin):
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
-            path('view-items/<str:day>/', self.admin_site.admin_view(self.view_items_by_day), name='view_items_by_day'),
+            path(
+                'view-items/<str:day>/',
+                self.admin_site.admin_view(condition(**versions.conditional_page(menu_stamp))(self.view_items_by_day)),
+                name='view_items_by_day'
+            ),
         ]
         return custom_urls + urls
 
@@ -100,7 +144,7 @@ class MenuItemAdmin(admin.ModelAdmin):
         return render(request, 'admin/menuitem_change_list.html', context)
 
     def view_items_by_day(self, request, day):
-        items = MenuItem.objects.filter(available_days__name=day)
+        items = menu.items_on(day)
         context = dict(
             self.admin_site.each_context(request),
             items=items,
@@ -110,7 +154,7 @@ class MenuItemAdmin(admin.ModelAdmin):
 
     def photo_preview(self, obj):
         if obj.photo:
-            return format_html('<img src="{}" width="60" height="60" style="object-fit: cover;" />', obj.photo.url)
+            return images.picture_html(obj, 'thumb', style='width: 60px; height: 60px; object-fit: cover;')
         return "No Image"
     photo_preview.short_description = 'Image'
 
@@ -128,10 +172,9 @@ class MenuItemAdmin(admin.ModelAdmin):
             return super().response_delete(request, obj_display, obj_id)
 
     def _redirect_to_day_view(self, obj):
-        days = obj.available_days.all()
+        days = [name for name in WEEKDAYS if obj.weekday_mask & weekday_bit(name)]
         if days:
-            day_name = days[0].name
-            url = reverse('admin:view_items_by_day', args=[day_name])
+            url = reverse('admin:view_items_by_day', args=[days[0]])
             return HttpResponseRedirect(url)
         return HttpResponseRedirect(reverse('admin:Future_menuitem_changelist'))
 
@@ -147,12 +190,16 @@ class OrderAdmin(admin.ModelAdmin):
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
-            path('view-orders/<str:date>/', self.admin_site.admin_view(self.view_orders), name='view_orders_by_date'),
+            path(
+                'view-orders/<str:date>/',
+                self.admin_site.admin_view(condition(**versions.conditional_page(day_stamp))(self.view_orders)),
+                name='view_orders_by_date'
+            ),
         ]
         return custom_urls + urls
 
     def changelist_view(self, request, extra_context=None):
-        order_dates = Order.objects.dates('created_at', 'day', order='DESC')
+        order_dates = DailySalesRollup.objects.order_by('-date').values_list('date', flat=True)
         data = [{'date': date, 'url': reverse('admin:view_orders_by_date', args=[date])} for date in order_dates]
 
         context = dict(
@@ -162,17 +209,49 @@ class OrderAdmin(admin.ModelAdmin):
         return render(request, 'admin/order_change_list.html', context)
 
     def view_orders(self, request, date):
-        orders = Order.objects.filter(created_at__date=date).order_by('-created_at')
+        orders = (
+            Order.objects
+            .filter(order_date=date)
+            .select_related('employee', 'pickup_slot')
+            .prefetch_related(Prefetch('cartitem_set', queryset=CartItem.objects.select_related('menu_item')))
+            .order_by('-created_at')
+        )
+        live_feed_url = None
         for order in orders:
             order.time = localtime(order.created_at).strftime('%I:%M %p')
+        # Only an ASGI server can keep the feed open; under WSGI the page stays static.
+        if date == str(localdate()) and settings.CANTEEN_ASGI:
+            latest = max((order.id for order in orders), default=0)
+            live_feed_url = f"{reverse('kitchen_feed')}?since={latest}"
 
         context = dict(
             self.admin_site.each_context(request),
             orders=orders,
+            rollup=DailySalesRollup.objects.filter(date=date).first(),
             selected_date=date,
+            live_feed_url=live_feed_url,
         )
         return render(request, 'admin/view_orders_by_date.html', context)
 
+    def save_model(self, request, obj, form, change):
+        # Checkout folds its orders into the rollup; orders added or moved here are rebuilt instead.
+        previous = Order.objects.filter(pk=obj.pk).values_list('order_date', flat=True).first() if change else None
+        super().save_model(request, obj, form, change)
+        for date in {previous, obj.order_date} - {None}:
+            rollups.rebuild(date)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        rollups.rebuild(obj.order_date)
+        slots.recount(obj.order_date)
+
+    def delete_queryset(self, request, queryset):
+        dates = set(queryset.values_list('order_date', flat=True))
+        super().delete_queryset(request, queryset)
+        for date in dates:
+            rollups.rebuild(date)
+            slots.recount(date)
+
 
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
@@ -184,21 +263,15 @@ class CartItemAdmin(admin.ModelAdmin):
         custom_urls = [
             path(
                 'view-cartitems/<str:date>/',
-                self.admin_site.admin_view(self.view_cartitems_by_date),
+                self.admin_site.admin_view(condition(**versions.conditional_page(day_stamp))(self.view_cartitems_by_date)),
                 name='view_cartitems_by_date'
             ),
         ]
         return custom_urls + urls
 
     def changelist_view(self, request, extra_context=None):
-        cart_dates = (
-            CartItem.objects
-            .annotate(order_date=Cast('order__created_at', DateField()))
-            .exclude(order_date__isnull=True)
-            .values_list('order_date', flat=True)
-            .distinct()
-            .order_by('-order_date')
-        )
+        # Every day with orders has a rollup row, so this reads one small index.
+        cart_dates = DailySalesRollup.objects.order_by('-date').values_list('date', flat=True)
 
         data = [{'date': date, 'url': reverse('admin:view_cartitems_by_date', args=[date])} for date in cart_dates]
 
@@ -211,17 +284,15 @@ class CartItemAdmin(admin.ModelAdmin):
     def view_cartitems_by_date(self, request, date):
         date_obj = datetime.strptime(date, "%Y-%m-%d").date()
         cart_items = (
-            CartItem.objects
-            .filter(order__created_at__date=date_obj)
-            .select_related('order', 'employee')
+            self.get_queryset(request)
+            .filter(order__order_date=date_obj)
             .order_by('order__created_at')
         )
 
         for idx, item in enumerate(cart_items, start=1):
             item.daily_order_number = idx
-            item.total_order_price_value = sum(
-                ci.total_price for ci in item.order.cartitem_set.all()
-            )
+            # SQLite hands back aggregate decimals unscaled (e.g. 70 rather than 70.00).
+            item.total_order_price_value = (item.total_order_price_value or Decimal(0)).quantize(CENTS)
 
         context = dict(
             self.admin_site.each_context(request),
@@ -230,6 +301,27 @@ class CartItemAdmin(admin.ModelAdmin):
         )
         return render(request, 'admin/cartitems_by_date.html', context)
 
+    def get_queryset(self, request):
+        line_total = ExpressionWrapper(
+            F('quantity') * F('menu_item__price'),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+        order_totals = (
+            CartItem.objects
+            .filter(order=OuterRef('order'))
+            .values('order')
+            .annotate(total=Sum(line_total))
+            .values('total')
+        )
+        return (
+            super().get_queryset(request)
+            .select_related('order', 'employee')
+            .prefetch_related(
+                Prefetch('order__cartitem_set', queryset=CartItem.objects.select_related('menu_item').order_by('id'))
+            )
+            .annotate(total_order_price_value=Subquery(order_totals))
+        )
+
     def order_number_display(self, obj):
         if hasattr(obj, 'daily_order_number'):
             return f"Order #{obj.daily_order_number}"
@@ -247,8 +339,49 @@ class CartItemAdmin(admin.ModelAdmin):
     items_list.short_description = 'Items'
 
     def total_order_price(self, obj):
-        try:
-            return sum(item.total_price for item in obj.order.cartitem_set.all())
-        except ObjectDoesNotExist:
-            return 0
+        # Quantized like view_cartitems_by_date: SQLite returns the aggregate unscaled.
+        return (getattr(obj, 'total_order_price_value', None) or Decimal(0)).quantize(CENTS)
     total_order_price.short_description = 'Total Price'
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipient', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('recipient', 'subject')
+    readonly_fields = ('order', 'created_at', 'sent_at', 'last_error')
+
+
+@admin.register(WalletTransaction)
+class WalletTransactionAdmin(admin.ModelAdmin):
+    list_display = ('employee', 'kind', 'amount', 'order', 'note', 'created_at')
+    list_filter = ('kind',)
+    search_fields = ('employee__name', 'note')
+    list_select_related = ('employee', 'order')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class PickupSlotItemInline(admin.TabularInline):
+    model = PickupSlotItem
+    fields = ('menu_item', 'capacity', 'booked')
+    readonly_fields = ('booked',)
+    autocomplete_fields = ('menu_item',)
+    extra = 0
+
+
+@admin.register(PickupSlot)
+class PickupSlotAdmin(admin.ModelAdmin):
+    list_display = ('date', 'start_time', 'end_time', 'capacity', 'booked')
+    list_filter = ('date',)
+    list_editable = ('capacity',)
+    readonly_fields = ('booked',)
+    inlines = [PickupSlotItemInline]
+    date_hierarchy = 'date'
@@ -0,0 +1,154 @@
+import json
+from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.views.decorators.http import require_GET, require_POST
+from django.views.decorators.csrf import ensure_csrf_cookie
+
+from . import menu, slots, images, checkout
+from .cart import Cart
+from .models import Employee
+
+
+def _error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _payload(request):
+    """The request's JSON object or form data; None when a JSON body doesn't parse to an object."""
+    if request.content_type == 'application/json':
+        try:
+            payload = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return payload if isinstance(payload, dict) else None
+    return request.POST
+
+
+def _session_employee(request):
+    employee_id = request.session.get('employee_id')
+    if not employee_id:
+        return None
+    return Employee.objects.filter(id=employee_id).first()
+
+
+async def _asession_employee(request):
+    employee_id = await request.session.aget('employee_id')
+    if not employee_id:
+        return None
+    return await Employee.objects.filter(id=employee_id).afirst()
+
+
+def _serialize_item(item):
+    return {
+        'id': item.id,
+        'name': item.name,
+        'description': item.description,
+        'price': str(item.price),
+        'quantity': item.quantity,
+        'photo': item.photo.url if item.photo else None,
+        'photo_variants': images.variant_urls(item),
+    }
+
+
+def _serialize_slot(slot):
+    return {
+        'id': slot.id,
+        'start_time': slot.start_time.strftime('%H:%M'),
+        'end_time': slot.end_time.strftime('%H:%M'),
+        'remaining': slot.remaining,
+    }
+
+
+def _serialize_cart(cart):
+    lines, _ = cart.resolve()
+    total = checkout.cart_total(lines)
+    return {
+        'items': [
+            {'id': item.id, 'name': item.name, 'quantity': qty, 'amount': str(item.price * qty)}
+            for item, qty in lines
+        ],
+        'total': str(total),
+    }
+
+
+@require_GET
+@ensure_csrf_cookie
+async def menu_items(request):
+    items = await sync_to_async(menu.current_menu_items)()
+    return JsonResponse({'items': [_serialize_item(item) for item in items]})
+
+
+@require_GET
+def pickup_slots(request):
+    return JsonResponse({'slots': [_serialize_slot(slot) for slot in slots.open_slots()]})
+
+
+@require_GET
+def cart_detail(request):
+    return JsonResponse(_serialize_cart(Cart(request)))
+
+
+@require_POST
+def cart_add(request, item_id):
+    payload = _payload(request)
+    if payload is None:
+        return _error("Request body must be a JSON object.", 400)
+    try:
+        quantity = max(int(payload.get('quantity', 1)), 1)
+    except (TypeError, ValueError):
+        return _error("Quantity must be a number.", 400)
+
+    cart = Cart(request)
+    cart.add(item_id, quantity)
+    return JsonResponse(_serialize_cart(cart))
+
+
+@require_POST
+def cart_remove(request, item_id):
+    cart = Cart(request)
+    cart.remove(item_id)
+    return JsonResponse(_serialize_cart(cart))
+
+
+@require_POST
+def place_order(request):
+    employee = _session_employee(request)
+    if employee is None:
+        return _error("Employee not recognized. Please scan QR again.", 401)
+
+    payload = _payload(request)
+    if payload is None:
+        return _error("Request body must be a JSON object.", 400)
+    try:
+        pickup_slot = payload.get('pickup_slot') or None
+        pickup_slot = int(pickup_slot) if pickup_slot is not None else None
+    except (TypeError, ValueError):
+        return _error("Pickup slot must be a slot id.", 400)
+
+    cart = Cart(request)
+    lines, _ = cart.resolve()
+    if not lines:
+        cart.clear()
+        return _error("Your cart is empty.", 400)
+
+    try:
+        order = checkout.place_order(employee, lines, pickup_slot=pickup_slot)
+    except checkout.CheckoutError as e:
+        return _error(str(e), 409)
+
+    cart.clear()
+    return JsonResponse({
+        'order_id': order.id,
+        'daily_order_number': order.daily_order_number,
+        'total_amount': str(order.total_amount),
+        'wallet_amount': str(employee.wallet_amount),
+        'pickup_slot': _serialize_slot(order.pickup_slot) if order.pickup_slot else None,
+    }, status=201)
+
+
+@require_GET
+async def wallet_balance(request):
+    employee = await _asession_employee(request)
+    if employee is None:
+        return _error("Employee not recognized. Please scan QR again.", 401)
+    return JsonResponse({'employee': employee.name, 'wallet_amount': str(employee.wallet_amount)})
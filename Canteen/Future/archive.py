@@ -0,0 +1,232 @@
+import os
+import gzip
+import json
+from pathlib import Path
+from decimal import Decimal
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.utils import timezone
+from django.db import transaction
+from django.db.models import Count, Prefetch
+
+from . import versions
+from .models import Order, CartItem
+
+ORDER_ARCHIVE_CHUNK_SIZE = getattr(settings, 'ORDER_ARCHIVE_CHUNK_SIZE', 2000)
+ORDER_PURGE_BATCH_SIZE = getattr(settings, 'ORDER_PURGE_BATCH_SIZE', 500)
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def archive_dir():
+    # Read per call rather than at import so tests and one-off runs can point it elsewhere.
+    return Path(getattr(settings, 'ORDER_ARCHIVE_DIR', settings.BASE_DIR / 'archive'))
+
+
+def month_bounds(day):
+    first = day.replace(day=1)
+    following = (first + timedelta(days=32)).replace(day=1)
+    return first, following - timedelta(days=1)
+
+
+def month_path(day, directory=None):
+    return Path(directory or archive_dir()) / f"orders-{day:%Y-%m}.jsonl.gz"
+
+
+def manifest_path(day, directory=None):
+    return Path(directory or archive_dir()) / f"orders-{day:%Y-%m}.manifest.json"
+
+
+def month_orders(first, last):
+    return (
+        Order.objects
+        .filter(order_date__range=(first, last))
+        .select_related('employee', 'pickup_slot')
+        .prefetch_related(Prefetch('cartitem_set', queryset=CartItem.objects.select_related('menu_item').order_by('id')))
+        .order_by('id')
+    )
+
+
+def order_record(order):
+    # Line prices are the menu price when archived; CartItem keeps no price of its own.
+    return {
+        'id': order.id,
+        'order_date': order.order_date.isoformat(),
+        'daily_order_number': order.daily_order_number,
+        'created_at': order.created_at.isoformat(),
+        'employee_id': order.employee_id,
+        'employee': order.employee.name,
+        'department': order.employee.department,
+        'total_amount': str(order.total_amount),
+        'pickup_slot': f"{order.pickup_slot.start_time:%H:%M}" if order.pickup_slot else None,
+        'items': [
+            {
+                'menu_item_id': cart_item.menu_item_id,
+                'name': cart_item.menu_item.name,
+                'quantity': cart_item.quantity,
+                'price': str(cart_item.menu_item.price),
+            }
+            for cart_item in order.cartitem_set.all()
+        ],
+    }
+
+
+def read_month(path):
+    """Yield every record of an archive file."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def day_summary(day, directory=None):
+    """
+    ``{'orders', 'last_id', 'revenue', 'lines'}`` for an archived day, from the
+    month's small manifest rather than the compressed file; None if not archived.
+    """
+    path = manifest_path(day, directory)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text()).get(day.isoformat())
+
+
+def _tally(days, record):
+    summary = days.setdefault(record['order_date'], {'orders': 0, 'last_id': 0, 'revenue': Decimal('0'), 'lines': 0})
+    summary['orders'] += 1
+    summary['last_id'] = max(summary['last_id'], record['id'])
+    summary['revenue'] += Decimal(record['total_amount'])
+    summary['lines'] += len(record['items'])
+
+
+def read_day(day, directory=None):
+    """Archived records for ``day`` in id order, or [] when its month isn't archived."""
+    path = month_path(day, directory)
+    if not path.exists():
+        return []
+    wanted = day.isoformat()
+    return sorted((record for record in read_month(path) if record['order_date'] == wanted), key=lambda record: record['id'])
+
+
+def write_month(day, chunk_size=ORDER_ARCHIVE_CHUNK_SIZE, directory=None):
+    """
+    Write every order of ``day``'s month, with its line items, to the month's file.
+
+    Orders are streamed with ``iterator(chunk_size)``, so memory use doesn't
+    grow with the month. Records from an earlier run whose rows are already
+    purged are carried over. The file and its manifest of per-day totals are
+    each replaced atomically. Returns the file's path and the ids of the
+    database rows written, the only ones safe to purge afterwards.
+    """
+    first, last = month_bounds(day)
+    path = month_path(day, directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    in_database = set(Order.objects.filter(order_date__range=(first, last)).values_list('id', flat=True))
+
+    days = {}
+    written = set()
+    partial = path.with_name(path.name + '.partial')
+    with gzip.open(partial, 'wt', encoding='utf-8') as out:
+        if path.exists():
+            for record in read_month(path):
+                if record['id'] not in in_database:
+                    out.write(json.dumps(record) + '\n')
+                    _tally(days, record)
+        for order in month_orders(first, last).iterator(chunk_size=chunk_size):
+            record = order_record(order)
+            out.write(json.dumps(record) + '\n')
+            _tally(days, record)
+            written.add(order.id)
+    os.replace(partial, path)
+
+    # Per-day totals, so reports can fingerprint an archived day without decompressing the month.
+    manifest = manifest_path(day, directory)
+    partial = manifest.with_name(manifest.name + '.partial')
+    partial.write_text(json.dumps({
+        date: dict(summary, revenue=str(summary['revenue'])) for date, summary in sorted(days.items())
+    }))
+    os.replace(partial, manifest)
+    return path, written
+
+
+def verify_month(day, directory=None, order_ids=None):
+    """
+    Check that every order of ``day``'s month still in the database is in the
+    archive with the same total and number of lines. With ``order_ids``, only
+    those orders are checked; rows added since they were written are left for
+    the next run. Returns the ids checked.
+    """
+    first, last = month_bounds(day)
+    try:
+        archived = {
+            record['id']: (Decimal(record['total_amount']), len(record['items']))
+            for record in read_month(month_path(day, directory))
+        }
+    except (OSError, EOFError, ValueError) as e:
+        raise ArchiveError(f"Unreadable archive for {first:%Y-%m}: {e}")
+
+    rows = (
+        Order.objects
+        .filter(order_date__range=(first, last))
+        .annotate(lines=Count('cartitem'))
+        .values_list('id', 'total_amount', 'lines')
+        .order_by('id')
+    )
+    checked = []
+    for order_id, total, lines in rows.iterator(chunk_size=ORDER_ARCHIVE_CHUNK_SIZE):
+        if order_ids is not None and order_id not in order_ids:
+            continue
+        if archived.get(order_id) != (total, lines):
+            raise ArchiveError(f"Order {order_id} is missing or different in the {first:%Y-%m} archive.")
+        checked.append(order_id)
+    return checked
+
+
+def purge_orders(order_ids, batch_size=ORDER_PURGE_BATCH_SIZE):
+    """
+    Delete orders and their line items, ``batch_size`` orders per transaction.
+
+    Line items are deleted explicitly (their foreign key is SET_NULL, so
+    deleting an order alone would leave them behind). Wallet transactions
+    and outbox emails keep their rows with the order link cleared. Rollups
+    are left alone. Returns the number of orders deleted.
+    """
+    order_ids = list(order_ids)
+    deleted = 0
+    for start in range(0, len(order_ids), batch_size):
+        batch = order_ids[start:start + batch_size]
+        with transaction.atomic():
+            dates = set(Order.objects.filter(id__in=batch).values_list('order_date', flat=True))
+            CartItem.objects.filter(order_id__in=batch).delete()
+            deleted += Order.objects.filter(id__in=batch).delete()[1].get(Order._meta.label, 0)
+            keys = ['orders', *(f"orders-day:{day}" for day in dates)]
+            transaction.on_commit(lambda keys=keys: versions.bump(*keys))
+    return deleted
+
+
+def months_before(cutoff):
+    """First days of the months that have orders before ``cutoff``."""
+    return list(Order.objects.filter(order_date__lt=cutoff).dates('order_date', 'month'))
+
+
+def archive_month(day, chunk_size=ORDER_ARCHIVE_CHUNK_SIZE, batch_size=ORDER_PURGE_BATCH_SIZE, directory=None):
+    """
+    Write, verify, then purge ``day``'s month. Only the orders that were both
+    written and verified are deleted, so rows placed in between stay for the
+    next run. Returns ``(path, orders archived, orders purged)``.
+    """
+    path, written = write_month(day, chunk_size, directory)
+    checked = verify_month(day, directory, written)
+    return path, len(checked), purge_orders(checked, batch_size)
+
+
+def parse_month(value):
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def default_cutoff(keep_months, today=None):
+    """The first day of the oldest month still kept in the database."""
+    first = (today or timezone.localdate()).replace(day=1)
+    for _ in range(keep_months):
+        first = (first - timedelta(days=1)).replace(day=1)
+    return first
@@ -0,0 +1,185 @@
+import random
+import tempfile
+import multiprocessing
+from decimal import Decimal
+from datetime import datetime, time, timedelta
+from contextlib import contextmanager
+from django.db import connection
+from django.utils import timezone
+from django.test.utils import override_settings
+
+from . import menu, rollups
+from .models import WEEKDAYS, Day, Employee, MenuItem, Order, CartItem, DailyOrderCounter
+
+
+# (name, start, end) of the canteen's service windows; the last one never closes
+# so a benchmark always has something on the menu whatever time it runs.
+MEAL_WINDOWS = [
+    ('Breakfast', time(7, 0), time(10, 30)),
+    ('Lunch', time(11, 30), time(15, 0)),
+    ('Snacks', time(15, 0), time(19, 0)),
+    ('All day', time(0, 0), time(23, 59, 59)),
+]
+
+
+@contextmanager
+def scratch_database(name=None, verbosity=0):
+    """
+    Point the default connection at a freshly migrated throwaway database.
+
+    Benchmarks seed and mutate lots of rows; this keeps them away from the
+    real data. ``name`` selects an on-disk SQLite file instead of memory.
+    """
+    if name:
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = name
+    old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    with tempfile.TemporaryDirectory(prefix='canteen-bench-media-') as media_root:
+        try:
+            with override_settings(MEDIA_ROOT=media_root):
+                yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+
+
+class QueryCounter:
+    """Count queries on the default connection without the 9000-entry cap of ``CaptureQueriesContext``."""
+
+    def __init__(self, table=None):
+        self.table = table
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.table is None or f'"{self.table}"' in sql:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+
+def seed_employees(count, wallet_amount=Decimal('1000.00')):
+    # bulk_create skips Employee.save(), so no QR codes are rendered here.
+    offset = Employee.objects.count()
+    return Employee.objects.bulk_create([
+        Employee(
+            name=f"Employee {offset + n}",
+            email=f"employee{offset + n}@example.com",
+            department=random.choice(['Engineering', 'Operations', 'Finance', 'HR']),
+            pin='1234',
+            wallet_amount=wallet_amount,
+        )
+        for n in range(count)
+    ])
+
+
+def seed_menu_items(count, quantity=1000):
+    return MenuItem.objects.bulk_create([
+        MenuItem(
+            name=f"Dish {n}",
+            description="Benchmark dish",
+            price=Decimal(random.randrange(10, 150)),
+            quantity=quantity,
+        )
+        for n in range(count)
+    ])
+
+
+def seed_menu(items_per_window=5, quantity=10 ** 6):
+    """Create every ``Day`` and a menu per meal window, each item on a random set of weekdays."""
+    days = [Day.objects.get_or_create(name=name)[0] for name in WEEKDAYS]
+    items = MenuItem.objects.bulk_create([
+        MenuItem(
+            name=f"{window} {n}",
+            description="Benchmark dish",
+            price=Decimal(random.randrange(10, 150)),
+            quantity=quantity,
+            start_time=start,
+            end_time=end,
+        )
+        for window, start, end in MEAL_WINDOWS
+        for n in range(items_per_window)
+    ])
+    Through = MenuItem.available_days.through
+    Through.objects.bulk_create([
+        Through(menuitem_id=item.id, day_id=day.id)
+        for item in items
+        for day in (days if item.end_time == time(23, 59, 59) else random.sample(days, random.randint(3, 7)))
+    ])
+    # bulk_create sends no m2m_changed, so fill the masks in directly.
+    masks = menu.sync_weekday_masks([item.id for item in items])
+    for item in items:
+        item.weekday_mask = masks[item.id]
+    return items
+
+
+def seed_history(days, orders_per_day, employees, menu_items, today=None):
+    """Back-fill ``days`` of past orders (weekdays only) ending yesterday."""
+    today = today or timezone.localdate()
+    for offset in range(days, 0, -1):
+        date = today - timedelta(days=offset)
+        if date.weekday() < 5:
+            seed_orders(date, orders_per_day, employees, menu_items)
+
+
+def lunch_rush_flow(employee_id, pin, item_ids):
+    """One customer's visit: scan, verify, browse, fill the cart, check out and look at history."""
+    return [
+        ('GET qr_scanner', 'get', '/', {}),
+        ('GET verify_employee', 'get', f'/verify-employee/{employee_id}/', {}),
+        ('POST verify_employee', 'post', f'/verify-employee/{employee_id}/', {'pin': pin}),
+        ('GET home', 'get', '/home', {}),
+        *[
+            ('POST add_to_cart', 'post', f'/add-to-cart/{item_id}/', {'quantity': random.randint(1, 2)})
+            for item_id in item_ids
+        ],
+        ('GET cart', 'get', '/cart/', {}),
+        ('POST place_order', 'post', '/place_order/', {}),
+        ('GET order_history', 'get', '/order_history/', {}),
+    ]
+
+
+def run_in_processes(func, arguments):
+    """
+    ``starmap`` ``func`` over ``arguments`` in forked processes, one per entry.
+
+    Threads would serialize on the GIL and hide lock contention. Close the
+    parent's database connection first; children open their own.
+    """
+    with multiprocessing.get_context('fork').Pool(len(arguments)) as pool:
+        return pool.starmap(func, arguments)
+
+
+def seed_orders(date, count, employees, menu_items, items_per_order=3, batch_size=2000):
+    """Insert ``count`` orders with line items on ``date`` without going through checkout."""
+    opening = timezone.make_aware(datetime.combine(date, time(11, 30)))
+    counter, _ = DailyOrderCounter.objects.get_or_create(date=date)
+    first_number = counter.last_number + 1
+
+    orders = []
+    for n in range(count):
+        orders.append(Order(
+            employee=random.choice(employees),
+            total_amount=Decimal('0.00'),
+            created_at=opening + timedelta(seconds=n * 7200 / max(count, 1)),
+            order_date=date,
+            daily_order_number=first_number + n,
+        ))
+    orders = Order.objects.bulk_create(orders, batch_size=batch_size)
+
+    cart_items = []
+    for order in orders:
+        for item in random.sample(menu_items, min(items_per_order, len(menu_items))):
+            qty = random.randint(1, 3)
+            order.total_amount += item.price * qty
+            cart_items.append(CartItem(employee=order.employee, menu_item=item, quantity=qty, order=order))
+    CartItem.objects.bulk_create(cart_items, batch_size=batch_size)
+    Order.objects.bulk_update(orders, ['total_amount'], batch_size=batch_size)
+
+    DailyOrderCounter.objects.filter(pk=counter.pk).update(last_number=first_number + count - 1)
+    rollups.rebuild(date)
+    return orders
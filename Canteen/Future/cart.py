@@ -0,0 +1,46 @@
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+
+from .checkout import resolve_cart
+
+CART_CACHE_ALIAS = getattr(settings, 'CART_CACHE_ALIAS', 'carts')
+
+
+class Cart:
+    """
+    A kiosk cart kept in the cart cache rather than the session.
+
+    Each session gets a random cart id once, so carts end with the session
+    (logout) and are evicted by the cache TTL; adding or removing items
+    never writes to the session or the database. The id is used rather than
+    the session key, which signed-cookie sessions change on every save.
+    """
+
+    def __init__(self, request):
+        self.cache = caches[CART_CACHE_ALIAS]
+        cart_id = request.session.get('cart_id')
+        if cart_id is None:
+            cart_id = request.session['cart_id'] = uuid.uuid4().hex
+        self.key = f"cart:{cart_id}"
+        self.items = self.cache.get(self.key, {})
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def add(self, item_id, quantity):
+        item_id = str(item_id)
+        self.items[item_id] = self.items.get(item_id, 0) + quantity
+        self.cache.set(self.key, self.items)
+
+    def remove(self, item_id):
+        self.items.pop(str(item_id), None)
+        self.cache.set(self.key, self.items)
+
+    def clear(self):
+        self.items = {}
+        self.cache.delete(self.key)
+
+    def resolve(self):
+        """Return ``(lines, missing_ids)`` for every line with a single ``in_bulk`` query."""
+        return resolve_cart(self.items)
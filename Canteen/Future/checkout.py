@@ -0,0 +1,174 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Case, F, Q, When
+
+from . import menu, slots, kitchen, metrics, rollups, versions
+from .outbox import queue_order_email
+from .models import MenuItem, Order, Employee, CartItem, PickupSlot, PickupSlotItem, WalletTransaction
+
+
+class CheckoutError(Exception):
+    pass
+
+
+class OutOfStock(CheckoutError):
+    def __init__(self, item, available):
+        self.item = item
+        self.available = available
+        super().__init__(f"Not enough quantity for {item.name}. Only {available} left.")
+
+
+class InsufficientBalance(CheckoutError):
+    def __init__(self, total, balance):
+        self.total = total
+        self.balance = balance
+        super().__init__(f"Insufficient balance! You need ₹{total}, but have only ₹{balance}.")
+
+
+class SlotUnavailable(CheckoutError):
+    def __init__(self):
+        super().__init__("That pickup slot is full or no longer taking orders. Please pick another.")
+
+
+class SlotItemFull(CheckoutError):
+    def __init__(self, item, available):
+        self.item = item
+        self.available = available
+        super().__init__(f"Only {available} more {item.name} can be ready for that pickup slot. Please pick another.")
+
+
+def resolve_cart(cart):
+    """Return ``(lines, missing_ids)`` for a session cart using a single query."""
+    items = MenuItem.objects.in_bulk([int(item_id) for item_id in cart])
+    lines, missing = [], []
+    for item_id, qty in cart.items():
+        item = items.get(int(item_id))
+        if item is None:
+            missing.append(item_id)
+        else:
+            lines.append((item, qty))
+    return lines, missing
+
+
+def cart_total(lines):
+    return sum((item.price * qty for item, qty in lines), Decimal('0.00'))
+
+
+class _ShortStock(Exception):
+    pass
+
+
+def _deduct_stock(lines):
+    """Take ``lines`` out of stock; returns True if that sold any of the items out."""
+    # One guarded UPDATE for every line: a row is only touched when it still
+    # has enough stock, so a short rowcount means somebody else got there first.
+    guard = Q()
+    for item, qty in lines:
+        guard |= Q(pk=item.pk, quantity__gte=qty)
+
+    try:
+        # In a savepoint, so a short update is undone before the stock is read
+        # back; otherwise this order's own deductions would blame the wrong line.
+        with transaction.atomic():
+            updated = MenuItem.objects.filter(guard).update(
+                quantity=Case(*[When(pk=item.pk, then=F('quantity') - qty) for item, qty in lines])
+            )
+            if updated != len(lines):
+                raise _ShortStock
+    except _ShortStock:
+        current = MenuItem.objects.in_bulk([item.pk for item, _ in lines])
+        for item, qty in lines:
+            fresh = current.get(item.pk)
+            available = fresh.quantity if fresh else 0
+            if available < qty:
+                raise OutOfStock(item, available)
+        raise OutOfStock(lines[0][0], 0)
+
+    return MenuItem.objects.filter(pk__in=[item.pk for item, _ in lines], quantity=0).exists()
+
+
+def _deduct_wallet(employee, total):
+    updated = Employee.objects.filter(pk=employee.pk, wallet_amount__gte=total).update(
+        wallet_amount=F('wallet_amount') - total
+    )
+    if not updated:
+        employee.refresh_from_db(fields=['wallet_amount'])
+        raise InsufficientBalance(total, employee.wallet_amount)
+
+
+def _book_slot(slot_id, lines):
+    # The slot and item counters are guarded like stock, so a full slot
+    # can never be overbooked by two kiosks checking out at once.
+    if not slots.bookable().filter(pk=slot_id).update(booked=F('booked') + 1):
+        raise SlotUnavailable()
+
+    limits = PickupSlotItem.objects.filter(slot_id=slot_id, menu_item__in=[item.pk for item, _ in lines])
+    limits = {limit.menu_item_id: limit for limit in limits}
+    capped = [(item, qty) for item, qty in lines if item.pk in limits]
+    if capped:
+        guard = Q()
+        for item, qty in capped:
+            guard |= Q(menu_item=item, booked__lte=F('capacity') - qty)
+        updated = PickupSlotItem.objects.filter(slot_id=slot_id).filter(guard).update(
+            booked=Case(*[When(menu_item=item, then=F('booked') + qty) for item, qty in capped])
+        )
+        if updated != len(capped):
+            for item, qty in capped:
+                available = limits[item.pk].capacity - limits[item.pk].booked
+                if available < qty:
+                    raise SlotItemFull(item, max(available, 0))
+            raise SlotItemFull(capped[0][0], 0)
+    return PickupSlot.objects.get(pk=slot_id)
+
+
+def place_order(employee, lines, pickup_slot=None):
+    """
+    Charge ``employee`` for ``lines`` and create the order, for collection
+    in the ``pickup_slot`` (an id) if one is given.
+
+    Stock, wallet and slot counters are changed with guarded UPDATEs rather
+    than read-modify-write; any guard that misses rolls the whole order back.
+    """
+    total = cart_total(lines)
+
+    try:
+        with metrics.CHECKOUT_SECONDS.time():
+            order = _place_order(employee, lines, total, pickup_slot)
+    except OutOfStock:
+        metrics.CHECKOUT_REJECTIONS.inc('out_of_stock')
+        raise
+    except InsufficientBalance:
+        metrics.CHECKOUT_REJECTIONS.inc('insufficient_balance')
+        raise
+    except (SlotUnavailable, SlotItemFull):
+        metrics.CHECKOUT_REJECTIONS.inc('pickup_slot_full')
+        raise
+
+    metrics.ORDERS.inc()
+    metrics.ORDER_REVENUE.inc(amount=float(total))
+    return order
+
+
+def _place_order(employee, lines, total, pickup_slot=None):
+    with transaction.atomic():
+        sold_out = _deduct_stock(lines)
+        _deduct_wallet(employee, total)
+        slot = _book_slot(pickup_slot, lines) if pickup_slot else None
+
+        order = Order.objects.create(employee=employee, total_amount=total, pickup_slot=slot)
+        WalletTransaction.objects.create(employee=employee, order=order, kind=WalletTransaction.DEBIT, amount=-total)
+        cart_items = CartItem.objects.bulk_create([
+            CartItem(employee=employee, menu_item=item, quantity=qty, order=order)
+            for item, qty in lines
+        ])
+        queue_order_email(employee, order, cart_items)
+        rollups.record_order(order, lines)
+        # The cached menu only goes stale when an item sells out; the remaining
+        # counts it shows are a hint, and the stock guard above has the last word.
+        if sold_out:
+            transaction.on_commit(menu.invalidate)
+        transaction.on_commit(lambda: versions.bump(f"employee:{employee.pk}"))
+        transaction.on_commit(lambda: kitchen.publish_order(order, lines))
+        employee.refresh_from_db(fields=['wallet_amount'])
+
+    return order
@@ -0,0 +1,134 @@
+import hashlib
+import threading
+from io import BytesIO
+from PIL import Image, ImageOps
+from django.conf import settings
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+from django.db import connection, transaction
+from django.core.files.base import ContentFile
+from concurrent.futures import ThreadPoolExecutor
+from django.core.files.storage import default_storage
+
+from . import menu, versions
+from .models import MenuItem
+
+IMAGE_SIZES = getattr(settings, 'IMAGE_DERIVATIVE_SIZES', {'thumb': (160, 160), 'card': (640, 360)})
+IMAGE_QUALITY = getattr(settings, 'IMAGE_DERIVATIVE_QUALITY', 80)
+IMAGE_WORKERS = getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 2)
+
+# (extension, Pillow format, save options)
+IMAGE_FORMATS = (
+    ('webp', 'WEBP', {'quality': IMAGE_QUALITY, 'method': 6}),
+    ('jpg', 'JPEG', {'quality': IMAGE_QUALITY, 'optimize': True, 'progressive': True}),
+)
+DERIVATIVE_DIR = 'derivatives'
+DERIVATIVE_NAME_PATTERN = r'[0-9a-f]{16}_\d+x\d+\.(?:webp|jpg)'
+
+_lock = threading.Lock()
+_pending = set()
+_executor = None
+
+
+def build_derivatives(field_file):
+    """
+    Render every size and format of ``field_file`` into default storage.
+
+    File names are derived from the source bytes, so they never change
+    content and can be cached forever; returns the ``photo_variants`` value.
+    """
+    with field_file.open('rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    variants = {'source': field_file.name}
+
+    try:
+        image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+        image = image.convert('RGB')
+    except (OSError, Image.DecompressionBombError):
+        # Not an image we can read; keep serving the upload as it is.
+        return variants
+
+    for size, (width, height) in IMAGE_SIZES.items():
+        resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        for ext, fmt, options in IMAGE_FORMATS:
+            name = f"{DERIVATIVE_DIR}/{digest}_{width}x{height}.{ext}"
+            if not default_storage.exists(name):
+                buffer = BytesIO()
+                resized.save(buffer, fmt, **options)
+                name = default_storage.save(name, ContentFile(buffer.getvalue()))
+            variants.setdefault(size, {})[ext] = name
+    return variants
+
+
+def needs_derivatives(instance):
+    return bool(instance.photo) and instance.photo_variants.get('source') != instance.photo.name
+
+
+def generate(model, pk):
+    instance = model._default_manager.filter(pk=pk).first()
+    if instance is None or not needs_derivatives(instance):
+        return False
+
+    variants = build_derivatives(instance.photo)
+    # Don't overwrite the variants of a photo that was replaced meanwhile.
+    updated = model._default_manager.filter(pk=pk, photo=instance.photo.name).update(photo_variants=variants)
+    if updated:
+        # update() skips post_save, so refresh what those receivers would have.
+        if model is MenuItem:
+            menu.invalidate()
+        else:
+            versions.bump(f"employee:{pk}")
+    return bool(updated)
+
+
+def _run(model, pk, name):
+    try:
+        generate(model, pk)
+    finally:
+        with _lock:
+            _pending.discard((model, pk, name))
+        connection.close()
+
+
+def _submit(key):
+    global _executor
+    with _lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix='photo-derivatives')
+        _executor.submit(_run, *key)
+
+
+def schedule(instance):
+    """Build ``instance``'s derivatives in a background thread once the save commits."""
+    key = (type(instance), instance.pk, instance.photo.name)
+    transaction.on_commit(lambda: _submit(key))
+
+
+def variant_urls(instance):
+    if not instance.photo or instance.photo_variants.get('source') != instance.photo.name:
+        return {}
+    return {
+        size: {ext: default_storage.url(name) for ext, name in formats.items()}
+        for size, formats in instance.photo_variants.items() if size in IMAGE_SIZES
+    }
+
+
+def picture_html(instance, size, **attrs):
+    """``<picture>`` markup for ``instance.photo`` at ``size``, or the original upload until it's ready."""
+    if not instance.photo:
+        return ''
+
+    attrs = {'loading': 'lazy', **attrs}
+    urls = variant_urls(instance).get(size)
+    if not urls:
+        return format_html('<img src="{}"{}>', instance.photo.url, flatatt(attrs))
+
+    width, height = IMAGE_SIZES[size]
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}"><img src="{}" width="{}" height="{}"{}></picture>',
+        urls['webp'], urls['jpg'], width, height, flatatt(attrs),
+    )
@@ -0,0 +1,212 @@
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager
+from django.conf import settings
+from django.utils import timezone
+from django.db.models import Prefetch
+from asgiref.sync import sync_to_async
+
+from . import versions
+from .models import Order, CartItem
+
+# Orders kept in memory for screens that reconnect with a cursor.
+KITCHEN_FEED_BUFFER = getattr(settings, 'KITCHEN_FEED_BUFFER', 500)
+# Seconds between comment lines that stop proxies closing an idle stream.
+KITCHEN_FEED_KEEPALIVE = getattr(settings, 'KITCHEN_FEED_KEEPALIVE', 15)
+# Orders placed by other worker processes never reach this one's buffer, so
+# every stream checks the shared day version this often and catches up from
+# the database when it has moved. 0 turns this off (single-process servers).
+KITCHEN_FEED_RESYNC = getattr(settings, 'KITCHEN_FEED_RESYNC', 5)
+KITCHEN_FEED_RETRY_MS = getattr(settings, 'KITCHEN_FEED_RETRY_MS', 3000)
+# Under WSGI a stream holds a worker thread, so it polls the database for
+# this long and then ends; the screen reconnects with its Last-Event-ID.
+KITCHEN_FEED_WSGI_SECONDS = getattr(settings, 'KITCHEN_FEED_WSGI_SECONDS', 25)
+KITCHEN_FEED_POLL_SECONDS = getattr(settings, 'KITCHEN_FEED_POLL_SECONDS', 1)
+
+
+def order_event(order, lines):
+    return {
+        'id': order.id,
+        'daily_order_number': order.daily_order_number,
+        'employee': order.employee.name,
+        'created_at': timezone.localtime(order.created_at).isoformat(),
+        'total_amount': str(order.total_amount),
+        'pickup_slot': f"{order.pickup_slot.start_time:%H:%M}" if order.pickup_slot else None,
+        'items': [{'name': item.name, 'quantity': qty} for item, qty in lines],
+    }
+
+
+class OrderFeed:
+    """
+    In-process pub/sub for placed orders.
+
+    Events go into a ring buffer and wake every subscribed stream, whichever
+    thread publishes and whichever event loop the stream runs on.
+    """
+
+    def __init__(self, size=KITCHEN_FEED_BUFFER):
+        self.events = deque(maxlen=size)
+        # Id of the newest event pushed out of the buffer.
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._waiters = set()
+
+    def publish(self, event):
+        with self._lock:
+            if len(self.events) == self.events.maxlen:
+                self.evicted = self.events[0]['id']
+            self.events.append(event)
+            waiters = list(self._waiters)
+        for loop, woken in waiters:
+            try:
+                loop.call_soon_threadsafe(woken.set)
+            except RuntimeError:
+                # The stream's loop has closed under it.
+                with self._lock:
+                    self._waiters.discard((loop, woken))
+
+    @contextmanager
+    def subscribe(self):
+        """An ``asyncio.Event`` set whenever something is published; call from the stream's loop."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            yield waiter[1]
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+    def after(self, cursor):
+        """Buffered events newer than ``cursor``, or None if some of them have been evicted."""
+        with self._lock:
+            if self.evicted > cursor:
+                return None
+            return [event for event in self.events if event['id'] > cursor]
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+            self.evicted = 0
+
+
+feed = OrderFeed()
+
+
+def publish_order(order, lines):
+    feed.publish(order_event(order, lines))
+
+
+def orders_after(order_id):
+    """Events for today's orders after ``order_id``, read from the database."""
+    orders = (
+        Order.objects
+        .filter(order_date=timezone.localdate(), id__gt=order_id)
+        .select_related('employee', 'pickup_slot')
+        .prefetch_related(Prefetch('cartitem_set', queryset=CartItem.objects.select_related('menu_item').order_by('id')))
+        .order_by('id')
+    )
+    return [
+        order_event(order, [(cart_item.menu_item, cart_item.quantity) for cart_item in order.cartitem_set.all()])
+        for order in orders
+    ]
+
+
+def _day_token():
+    [(token, _)] = versions.get_versions(f"orders-day:{timezone.localdate()}")
+    return token
+
+
+def _message(event, cursor):
+    return f"id: {cursor}\nevent: order\ndata: {json.dumps(event)}\n\n"
+
+
+async def stream(cursor=None):
+    """
+    Server-sent events for every order after ``cursor``, then each new one.
+
+    Without a cursor the stream starts at the newest order. ``cursor``
+    only moves past ids known to be complete (ids are assigned in commit
+    order, so a database read settles everything up to its newest row)
+    and is what goes out as the event id: a reconnect may replay an order
+    but never skips one. Screens de-duplicate by the order id.
+    """
+    loop = asyncio.get_running_loop()
+    with feed.subscribe() as woken:
+        # Subscribed first, so nothing published from here on is missed.
+        stale = cursor is not None
+        if cursor is None:
+            cursor = await Order.objects.order_by('-id').values_list('id', flat=True).afirst() or 0
+        token = await sync_to_async(_day_token)() if KITCHEN_FEED_RESYNC else None
+        next_resync = loop.time() + KITCHEN_FEED_RESYNC
+        sent = set()
+        yield f"retry: {KITCHEN_FEED_RETRY_MS}\n\n"
+        last_output = loop.time()
+
+        while True:
+            woken.clear()
+            events = feed.after(cursor)
+            stale = stale or events is None
+            if KITCHEN_FEED_RESYNC and loop.time() >= next_resync:
+                next_resync = loop.time() + KITCHEN_FEED_RESYNC
+                current = await sync_to_async(_day_token)()
+                stale = stale or current != token
+                token = current
+
+            complete = cursor
+            if stale:
+                stored = await sync_to_async(orders_after)(cursor)
+                events = stored + (feed.after(cursor) or [])
+                if stored:
+                    complete = stored[-1]['id']
+                stale = False
+            elif not KITCHEN_FEED_RESYNC and events:
+                # Every order is published in this process, so the buffer is complete.
+                complete = events[-1]['id']
+
+            fresh = []
+            for event in sorted(events, key=lambda event: event['id']):
+                if event['id'] not in sent:
+                    sent.add(event['id'])
+                    fresh.append(event)
+            cursor = complete
+            sent = {order_id for order_id in sent if order_id > cursor}
+
+            for event in fresh:
+                yield _message(event, cursor)
+            if fresh:
+                last_output = loop.time()
+
+            timeout = KITCHEN_FEED_KEEPALIVE
+            if KITCHEN_FEED_RESYNC:
+                timeout = min(timeout, max(next_resync - loop.time(), 0))
+            try:
+                await asyncio.wait_for(woken.wait(), timeout)
+            except asyncio.TimeoutError:
+                if loop.time() - last_output >= KITCHEN_FEED_KEEPALIVE:
+                    yield ": keepalive\n\n"
+                    last_output = loop.time()
+
+
+def poll(cursor=None):
+    """
+    The synchronous, bounded stand-in for ``stream`` on WSGI servers.
+
+    Reads new orders from the database every ``KITCHEN_FEED_POLL_SECONDS``
+    and finishes after ``KITCHEN_FEED_WSGI_SECONDS``, so a screen never pins
+    a worker thread for longer than that.
+    """
+    if cursor is None:
+        cursor = Order.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    yield f"retry: {KITCHEN_FEED_RETRY_MS}\n\n"
+    deadline = time.monotonic() + KITCHEN_FEED_WSGI_SECONDS
+    while True:
+        for event in orders_after(cursor):
+            cursor = event['id']
+            yield _message(event, cursor)
+        if time.monotonic() >= deadline:
+            return
+        time.sleep(KITCHEN_FEED_POLL_SECONDS)
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from Future import archive
+
+ORDER_ARCHIVE_KEEP_MONTHS = getattr(settings, 'ORDER_ARCHIVE_KEEP_MONTHS', 3)
+
+
+class Command(BaseCommand):
+    help = (
+        "Move old orders and their line items into one compressed file per month, "
+        "verify each file against the database, then delete the rows in small batches. "
+        "Rerunning a month merges late rows into its file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before',
+            help=f"Archive months before this one (YYYY-MM). Defaults to keeping {ORDER_ARCHIVE_KEEP_MONTHS} "
+                 f"months plus the current one.",
+        )
+        parser.add_argument('--directory', help="Where the files go. Defaults to ORDER_ARCHIVE_DIR.")
+        parser.add_argument('--chunk-size', type=int, default=archive.ORDER_ARCHIVE_CHUNK_SIZE)
+        parser.add_argument('--batch-size', type=int, default=archive.ORDER_PURGE_BATCH_SIZE, help="Orders per delete.")
+        parser.add_argument('--no-purge', action='store_true', help="Write and verify the files but keep the rows.")
+
+    def handle(self, *args, **options):
+        try:
+            cutoff = archive.parse_month(options['before']) if options['before'] else None
+        except ValueError as e:
+            raise CommandError(e)
+        cutoff = cutoff or archive.default_cutoff(ORDER_ARCHIVE_KEEP_MONTHS)
+        if options['chunk_size'] <= 0 or options['batch_size'] <= 0:
+            raise CommandError("--chunk-size and --batch-size must be positive.")
+
+        months = archive.months_before(cutoff)
+        archived = purged = 0
+        for month in months:
+            try:
+                if options['no_purge']:
+                    path, written = archive.write_month(month, options['chunk_size'], options['directory'])
+                    count, deleted = len(archive.verify_month(month, options['directory'], written)), 0
+                else:
+                    path, count, deleted = archive.archive_month(
+                        month, options['chunk_size'], options['batch_size'], options['directory'],
+                    )
+            except archive.ArchiveError as e:
+                raise CommandError(e)
+            archived += count
+            purged += deleted
+            self.stdout.write(f"{month:%Y-%m}: {count} order(s) to {path}, {deleted} deleted.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} order(s) from {len(months)} month(s) before {cutoff:%Y-%m}; deleted {purged}."
+        ))
@@ -0,0 +1,243 @@
+import json
+import time
+import asyncio
+import tempfile
+from io import BytesIO
+from decimal import Decimal
+from importlib import import_module
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection
+from django.core.asgi import ASGIHandler
+from django.core.wsgi import WSGIHandler
+from django.test.utils import override_settings
+from django.core.management.base import BaseCommand
+
+from Future.models import Order
+from Future.profiling import percentile
+from Future.benchmarking import scratch_database, seed_employees, seed_history, seed_menu
+
+
+def read_paths(order_id):
+    """The read-heavy pages a kiosk polls between orders."""
+    return ['/home', '/api/menu/', '/api/wallet/', '/order_history/', f'/order_success/{order_id}/']
+
+
+class WsgiWorker:
+    """
+    One WSGI worker process served by a fixed thread pool, as gunicorn's
+    gthread worker runs it. A slow client keeps its thread busy while the
+    response is written.
+    """
+
+    def __init__(self, threads, slow_client):
+        self.handler = WSGIHandler()
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix='wsgi')
+        self.slow_client = slow_client
+
+    async def request(self, path, cookie):
+        return await asyncio.wrap_future(self.pool.submit(self.serve, path, cookie))
+
+    def serve(self, path, cookie):
+        started = {}
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+            'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1', 'HTTP_HOST': 'testserver', 'HTTP_COOKIE': cookie,
+            'wsgi.input': BytesIO(), 'wsgi.errors': BytesIO(), 'wsgi.url_scheme': 'http',
+            'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+        }
+        response = self.handler(environ, lambda status, headers: started.setdefault('status', status))
+        try:
+            for _ in response:
+                pass
+        finally:
+            response.close()
+        time.sleep(self.slow_client)
+        return int(started['status'].split()[0])
+
+    def close(self):
+        self.pool.shutdown()
+
+
+class AsgiWorker:
+    """One ASGI worker process: every connection is a task on a single event loop, as under uvicorn."""
+
+    def __init__(self, slow_client):
+        self.handler = ASGIHandler()
+        self.slow_client = slow_client
+
+    async def request(self, path, cookie):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        }
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        status = {}
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # The client never disconnects; Django cancels this once it has responded.
+            await asyncio.Future()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            elif not message.get('more_body'):
+                await asyncio.sleep(self.slow_client)
+
+        await self.handler(scope, receive, send)
+        return status['code']
+
+    def close(self):
+        pass
+
+
+class HttpTarget:
+    """A running server, one short-lived HTTP/1.1 connection per request."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+
+    async def request(self, path, cookie):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(
+                f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nCookie: {cookie}\r\n"
+                f"Connection: close\r\n\r\n".encode()
+            )
+            await writer.drain()
+            status_line = await reader.readline()
+            await reader.read()
+        finally:
+            writer.close()
+        return int(status_line.split()[1])
+
+    def close(self):
+        pass
+
+
+async def drive(server, connections, seconds, paths, cookies, timeout):
+    """Keep ``connections`` clients requesting ``paths`` back to back for ``seconds``."""
+    loop = asyncio.get_running_loop()
+    latencies, statuses, errors = [], {}, [0]
+    deadline = loop.time() + seconds
+
+    async def client(n):
+        sent = n
+        while loop.time() < deadline:
+            path = paths[sent % len(paths)]
+            sent += 1
+            started = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(server.request(path, cookies[n % len(cookies)]), timeout)
+            except (asyncio.TimeoutError, OSError, ValueError, IndexError):
+                errors[0] += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status >= 500:
+                errors[0] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(connections)))
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'statuses': statuses,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare how many concurrent connections the WSGI and ASGI deployments sustain on the read paths "
+        "(home, menu and wallet API, order history, order success). By default one in-process worker of "
+        "each is driven against a seeded scratch database: WSGI with a fixed thread pool, ASGI on one event "
+        "loop. With --wsgi-url/--asgi-url the same load is sent over HTTP to running servers instead "
+        "(e.g. gunicorn Canteen.wsgi --threads 8 and uvicorn Canteen.asgi:application)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, nargs='+', default=[8, 32, 128, 512])
+        parser.add_argument('--seconds', type=float, default=5.0, help="Duration of each level.")
+        parser.add_argument('--threads', type=int, default=8, help="Threads of the in-process WSGI worker.")
+        parser.add_argument(
+            '--slow-client-ms', type=float, default=0,
+            help="Time each client takes to read a response, e.g. 200 for kiosks on a weak Wi-Fi link.",
+        )
+        parser.add_argument('--timeout', type=float, default=30.0, help="Seconds before a request counts as failed.")
+        group = parser.add_argument_group("running servers")
+        group.add_argument('--wsgi-url', help="Base URL of the WSGI deployment.")
+        group.add_argument('--asgi-url', help="Base URL of the ASGI deployment.")
+        group.add_argument(
+            '--cookie', default='',
+            help="Cookie header of a verified kiosk session, sent to both servers (wallet and history need one).",
+        )
+        group = parser.add_argument_group("scratch data (in-process mode)")
+        group.add_argument('--employees', type=int, default=100)
+        group.add_argument('--history-days', type=int, default=20)
+        group.add_argument('--orders-per-day', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if options['wsgi_url'] or options['asgi_url']:
+            servers = {
+                name: (lambda url=url: HttpTarget(url))
+                for name, url in (('wsgi', options['wsgi_url']), ('asgi', options['asgi_url'])) if url
+            }
+            results = self.run(servers, read_paths(1), [options['cookie']], options)
+        else:
+            with tempfile.TemporaryDirectory(prefix='canteen-bench-asgi-') as db_dir, \
+                    override_settings(ALLOWED_HOSTS=['*']), \
+                    scratch_database(name=f"{db_dir}/bench.sqlite3"):
+                paths, cookies = self.seed_data(options)
+                slow_client = options['slow_client_ms'] / 1000
+                servers = {
+                    'wsgi': lambda: WsgiWorker(options['threads'], slow_client),
+                    'asgi': lambda: AsgiWorker(slow_client),
+                }
+                results = self.run(servers, paths, cookies, options)
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def seed_data(self, options):
+        self.stderr.write("Seeding scratch database...")
+        items = seed_menu()
+        employees = seed_employees(options['employees'], wallet_amount=Decimal('1000.00'))
+        seed_history(options['history_days'], options['orders_per_day'], employees, items)
+
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        cookies = []
+        for employee in employees:
+            session = store()
+            session['employee_id'] = employee.id
+            session.save()
+            cookies.append(f"{settings.SESSION_COOKIE_NAME}={session.session_key}")
+        return read_paths(Order.objects.values_list('id', flat=True).first()), cookies
+
+    def run(self, servers, paths, cookies, options):
+        results = {}
+        saved_max_age = connection.settings_dict['CONN_MAX_AGE']
+        for connections in options['connections']:
+            level = results[str(connections)] = {}
+            for name, make_server in servers.items():
+                self.stderr.write(f"{name}: {connections} connections for {options['seconds']}s...")
+                # Mirror the deployments: ASGI requests don't keep connections (see settings.DATABASES).
+                connection.settings_dict['CONN_MAX_AGE'] = 0 if name == 'asgi' else saved_max_age
+                server = make_server()
+                try:
+                    level[name] = asyncio.run(
+                        drive(server, connections, options['seconds'], paths, cookies, options['timeout'])
+                    )
+                finally:
+                    server.close()
+                    connection.settings_dict['CONN_MAX_AGE'] = saved_max_age
+        return results
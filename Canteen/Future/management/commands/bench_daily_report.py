@@ -0,0 +1,61 @@
+import json
+import time
+from io import BytesIO
+from datetime import date
+from django.core.management.base import BaseCommand
+
+from Future import reports
+from Future.models import Order
+from Future.benchmarking import QueryCounter, scratch_database, seed_employees, seed_menu_items, seed_orders
+
+
+def legacy_report_rows(day):
+    # The pre-prefetch implementation: one query per order for its lines
+    # and one per line for its menu item, plus one per order for the employee.
+    rows = []
+    for order in Order.objects.filter(created_at__date=day):
+        items = ", ".join([f"{item.menu_item.name} × {item.quantity}" for item in order.cartitem_set.all()])
+        rows.append([order.employee.name, items, f"₹{order.total_amount}", order.created_at.strftime('%I:%M %p')])
+    return rows
+
+
+def measure(func):
+    with QueryCounter() as queries:
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+    return {'queries': queries.count, 'ms': round(elapsed * 1000, 1)}
+
+
+class Command(BaseCommand):
+    help = "Compare query counts and latency of the daily PDF report at several order volumes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+        parser.add_argument('--skip-legacy', action='store_true', help="Don't time the old N+1 implementation.")
+
+    def handle(self, *args, **options):
+        results = []
+        with scratch_database():
+            employees = seed_employees(200)
+            menu_items = seed_menu_items(30)
+
+            for n, size in enumerate(options['sizes']):
+                day = date(2025, 1, 1 + n)
+                seed_orders(day, size, employees, menu_items)
+                result = {'orders': size}
+
+                if not options['skip_legacy']:
+                    result['legacy'] = measure(
+                        lambda: reports.render_daily_report(day, legacy_report_rows(day), BytesIO())
+                    )
+                result['prefetched'] = measure(
+                    lambda: reports.render_daily_report(day, reports.report_rows(reports.daily_orders(day)), BytesIO())
+                )
+                result['cold_artifact'] = measure(lambda: reports.daily_report_path(day))
+                result['cached_artifact'] = measure(lambda: reports.daily_report_path(day))
+
+                results.append(result)
+                self.stderr.write(f"{size} orders done")
+
+        self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,71 @@
+import json
+from decimal import Decimal
+from django.test import Client
+from django.test.utils import override_settings
+from django.core.management.base import BaseCommand
+
+from Future.models import Employee, MenuItem
+from Future.benchmarking import QueryCounter, scratch_database
+
+PROFILES = {
+    'before (db sessions, session-backed messages)': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'MESSAGE_STORAGE': 'django.contrib.messages.storage.fallback.FallbackStorage',
+    },
+    'cached_db + cookie messages': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+        'MESSAGE_STORAGE': 'django.contrib.messages.storage.cookie.CookieStorage',
+    },
+    'signed_cookies + cookie messages': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.signed_cookies',
+        'MESSAGE_STORAGE': 'django.contrib.messages.storage.cookie.CookieStorage',
+    },
+}
+
+
+def kiosk_flow(employee, item):
+    return [
+        ('GET qr_scanner', 'get', '/', {}),
+        ('POST verify_employee', 'post', f'/verify-employee/{employee.id}/', {'pin': employee.pin}),
+        ('GET home', 'get', '/home', {}),
+        ('POST add_to_cart', 'post', f'/add-to-cart/{item.id}/', {'quantity': 1}),
+        ('GET home', 'get', '/home', {}),
+        ('POST add_to_cart', 'post', f'/add-to-cart/{item.id}/', {'quantity': 1}),
+        ('GET cart', 'get', '/cart/', {}),
+        ('POST place_order', 'post', '/place_order/', {}),
+        ('GET order_history', 'get', '/order_history/', {}),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Count django_session queries per request across the kiosk flow for each session profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=5, help="Kiosk sessions to run per profile.")
+
+    def handle(self, *args, **options):
+        results = {}
+        with scratch_database(), override_settings(ALLOWED_HOSTS=['*']):
+            item = MenuItem.objects.create(name="Tea", description="", price=Decimal('10.00'), quantity=10 ** 6)
+
+            for name, profile in PROFILES.items():
+                per_step = {}
+                with override_settings(**profile):
+                    for n in range(options['rounds']):
+                        employee = Employee.objects.create(
+                            name=f"{name} {n}", email=f"bench{len(results)}-{n}@example.com",
+                            department="Ops", pin="1234", wallet_amount=Decimal('1000.00'),
+                        )
+                        client = Client()
+                        for step, method, url, data in kiosk_flow(employee, item):
+                            with QueryCounter(table='django_session') as queries:
+                                getattr(client, method)(url, data)
+                            per_step.setdefault(step, []).append(queries.count)
+
+                all_counts = [count for counts in per_step.values() for count in counts]
+                results[name] = {
+                    'session_queries_per_request': round(sum(all_counts) / len(all_counts), 2),
+                    'by_step': {step: round(sum(counts) / len(counts), 2) for step, counts in per_step.items()},
+                }
+
+        self.stdout.write(json.dumps(results, indent=2))
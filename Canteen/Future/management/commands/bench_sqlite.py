@@ -0,0 +1,99 @@
+import json
+import time
+import tempfile
+from decimal import Decimal
+from django.conf import settings
+from django.test import Client
+from django.db import OperationalError, connection, connections
+from django.test.utils import override_settings
+from django.core.management.base import BaseCommand, CommandError
+
+from Future.profiling import percentile
+from Future.benchmarking import run_in_processes, scratch_database, seed_employees, seed_menu_items
+
+
+def run_kiosk(employee_id, item_id, deadline):
+    """One kiosk hammering ``home`` and ``place_order`` until ``deadline``; runs in a forked process."""
+    timings = {'home': [], 'place_order': []}
+    errors = {'home': 0, 'place_order': 0}
+
+    def timed(view, request):
+        started = time.perf_counter()
+        try:
+            request()
+        except OperationalError:
+            errors[view] += 1
+        else:
+            timings[view].append(time.perf_counter() - started)
+
+    client = Client()
+    session = client.session
+    session['employee_id'] = employee_id
+    session.save()
+    try:
+        while time.time() < deadline:
+            timed('home', lambda: client.get('/home'))
+            client.post(f'/add-to-cart/{item_id}/', {'quantity': 1})
+            timed('place_order', lambda: client.post('/place_order/'))
+    finally:
+        connections.close_all()
+    return timings, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Run kiosk processes against home and place_order on a scratch SQLite file, "
+        "once per SQLITE_PROFILES entry, and report throughput, latency and lock errors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=10.0, help="Duration of each profile's run.")
+        parser.add_argument('--profiles', nargs='+', default=list(settings.SQLITE_PROFILES))
+
+    def handle(self, *args, **options):
+        unknown = set(options['profiles']) - set(settings.SQLITE_PROFILES)
+        if unknown:
+            raise CommandError(f"Unknown profile(s): {', '.join(sorted(unknown))}")
+
+        results = {}
+        for name in options['profiles']:
+            self.stdout.write(f"Running '{name}' for {options['seconds']}s with {options['workers']} workers...")
+            results[name] = self.run_profile(settings.SQLITE_PROFILES[name], options['workers'], options['seconds'])
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def run_profile(self, profile, workers, seconds):
+        saved = {key: connection.settings_dict.get(key) for key in ('OPTIONS', 'CONN_MAX_AGE')}
+        connection.settings_dict.update(OPTIONS=profile['OPTIONS'], CONN_MAX_AGE=profile['CONN_MAX_AGE'])
+        connection.close()
+        try:
+            with tempfile.TemporaryDirectory(prefix='canteen-bench-db-') as db_dir, \
+                    override_settings(SQLITE_PRAGMAS=profile['PRAGMAS'], ALLOWED_HOSTS=['*']), \
+                    scratch_database(name=f"{db_dir}/bench.sqlite3"):
+                employees = seed_employees(workers, wallet_amount=Decimal('1000000.00'))
+                [item] = seed_menu_items(1, quantity=10 ** 7)
+                with connection.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode")
+                    [journal_mode] = cursor.fetchone()
+                # Each forked worker opens its own connection with the profile applied.
+                connection.close()
+
+                deadline = time.time() + seconds
+                started = time.perf_counter()
+                runs = run_in_processes(run_kiosk, [(employee.id, item.id, deadline) for employee in employees])
+                elapsed = time.perf_counter() - started
+        finally:
+            connection.close()
+            connection.settings_dict.update(saved)
+
+        report = {'journal_mode': journal_mode}
+        for view in ('home', 'place_order'):
+            timings = [t for run_timings, _ in runs for t in run_timings[view]]
+            report[view] = {
+                'requests': len(timings),
+                'per_second': round(len(timings) / elapsed, 1),
+                'p50_ms': percentile(timings, 0.50),
+                'p95_ms': percentile(timings, 0.95),
+                'lock_errors': sum(run_errors[view] for _, run_errors in runs),
+            }
+        return report
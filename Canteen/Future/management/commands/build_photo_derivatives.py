@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from Future import images
+from Future.models import Employee, MenuItem
+
+
+class Command(BaseCommand):
+    help = "Render thumbnail and card derivatives for menu and employee photos that don't have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Re-render every photo, e.g. after changing sizes.")
+
+    def handle(self, *args, **options):
+        for model in (MenuItem, Employee):
+            photos = model.objects.exclude(photo='').exclude(photo__isnull=True)
+            if options['force']:
+                photos.update(photo_variants={})
+
+            built = sum(images.generate(model, pk) for pk in photos.values_list('pk', flat=True).iterator())
+            self.stdout.write(f"{model._meta.verbose_name_plural}: built derivatives for {built} photo(s).")
+
+        self.stdout.write(self.style.SUCCESS("Photo derivatives are up to date."))
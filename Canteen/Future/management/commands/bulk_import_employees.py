@@ -0,0 +1,104 @@
+import csv
+from decimal import Decimal, InvalidOperation
+from concurrent.futures import ProcessPoolExecutor
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+
+from Future.models import Employee, WalletTransaction, render_qr_png
+
+REQUIRED_COLUMNS = {'name', 'email', 'department', 'pin'}
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        missing = REQUIRED_COLUMNS - set(reader.fieldnames or [])
+        if missing:
+            raise CommandError(f"CSV is missing column(s): {', '.join(sorted(missing))}")
+
+        for line, row in enumerate(reader, start=2):
+            try:
+                wallet_amount = Decimal(row.get('wallet_amount') or '0.00')
+            except InvalidOperation:
+                raise CommandError(f"Line {line}: invalid wallet_amount {row['wallet_amount']!r}")
+            yield Employee(
+                name=row['name'].strip(),
+                email=row['email'].strip().lower(),
+                department=row['department'].strip(),
+                pin=row['pin'].strip(),
+                wallet_amount=wallet_amount,
+            )
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Import employees from a CSV (name,email,department,pin[,wallet_amount]). "
+        "Rows are bulk-inserted and QR codes are rendered in a process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=None, help="QR rendering processes (default: CPU count).")
+
+    def handle(self, *args, **options):
+        created = skipped = 0
+
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for batch in batched(read_rows(options['csv_path']), options['batch_size']):
+                emails = [employee.email for employee in batch]
+                existing = set(
+                    Employee.objects
+                    .annotate(email_lower=Lower('email'))
+                    .filter(email_lower__in=emails)
+                    .values_list('email_lower', flat=True)
+                )
+
+                new, seen = [], set(existing)
+                for employee in batch:
+                    if employee.email in seen:
+                        skipped += 1
+                        continue
+                    seen.add(employee.email)
+                    new.append(employee)
+                if not new:
+                    continue
+
+                # Only the inserts hold the write lock. bulk_create bypasses
+                # Employee.save(), so no QR is rendered per row.
+                with transaction.atomic():
+                    new = Employee.objects.bulk_create(new)
+                    WalletTransaction.objects.bulk_create([
+                        WalletTransaction(
+                            employee=employee,
+                            kind=WalletTransaction.TOPUP,
+                            amount=employee.wallet_amount,
+                            note="Opening balance",
+                        )
+                        for employee in new if employee.wallet_amount
+                    ])
+
+                # QR codes need the new ids, so the batch is rendered in parallel
+                # once the rows are committed; nothing is left on disk by a rollback.
+                pngs = pool.map(render_qr_png, [employee.id for employee in new], chunksize=16)
+                for employee, png in zip(new, pngs):
+                    employee.qr_code.save(f"{employee.name}_qr.png", ContentFile(png), save=False)
+                Employee.objects.bulk_update(new, ['qr_code'])
+
+                created += len(new)
+                self.stdout.write(f"Imported {created} employee(s)...")
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {created} employee(s), skipped {skipped} existing email(s)."))
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+from django.utils import timezone
+from django.core.management.base import BaseCommand, CommandError
+
+from Future import slots
+from Future.models import MenuItem, weekday_bit
+
+
+def _parse(value, fmt):
+    try:
+        return datetime.strptime(value, fmt)
+    except ValueError as e:
+        raise CommandError(e)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create pickup slots for upcoming days. Existing slots keep their capacity and bookings, "
+        "so this is safe to run from cron every night."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="First day (YYYY-MM-DD). Defaults to today.")
+        parser.add_argument(
+            '--days', type=int, default=1,
+            help="Number of serving days; days with nothing on the menu are skipped.",
+        )
+        parser.add_argument('--start', default='11:30', help="First slot starts at (HH:MM).")
+        parser.add_argument('--end', default='14:30', help="Last slot ends by (HH:MM).")
+        parser.add_argument('--minutes', type=int, default=slots.PICKUP_SLOT_MINUTES)
+        parser.add_argument('--capacity', type=int, default=slots.PICKUP_SLOT_CAPACITY, help="Orders per slot.")
+        parser.add_argument(
+            '--item-capacity', type=int,
+            help="Also cap every item on the day's menu at this many per slot.",
+        )
+
+    def handle(self, *args, **options):
+        first = _parse(options['date'], "%Y-%m-%d").date() if options['date'] else timezone.localdate()
+        start = _parse(options['start'], "%H:%M").time()
+        end = _parse(options['end'], "%H:%M").time()
+        if options['minutes'] <= 0 or start >= end:
+            raise CommandError("Slots need a positive length and --start before --end.")
+
+        serving_days = 0
+        for mask in MenuItem.objects.values_list('weekday_mask', flat=True).distinct():
+            serving_days |= mask
+        created = days = 0
+        date = first
+        while days < options['days'] and date < first + timedelta(days=366):
+            if serving_days & weekday_bit(date.strftime('%A')):
+                created += slots.generate(
+                    date, start, end, options['minutes'], options['capacity'], options['item_capacity'],
+                )
+                days += 1
+            date += timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(f"Created {created} pickup slot(s) over {days} day(s)."))
@@ -0,0 +1,234 @@
+import json
+import time
+import random
+import tempfile
+import subprocess
+import urllib.error
+import urllib.parse
+import urllib.request
+from decimal import Decimal
+from http.cookiejar import CookieJar
+from django.conf import settings
+from django.test import Client
+from django.utils import timezone
+from django.db import connection, connections
+from django.test.utils import override_settings
+from django.core.management.base import BaseCommand, CommandError
+
+from Future import menu
+from Future.models import Employee
+from Future.profiling import percentile
+from Future.benchmarking import (
+    QueryCounter, lunch_rush_flow, run_in_processes, scratch_database,
+    seed_employees, seed_history, seed_menu,
+)
+
+
+class ClientSession:
+    """Drive the app in-process; query counts come from the worker's own connection."""
+
+    def __init__(self):
+        self.client = Client()
+
+    def request(self, method, url, data):
+        with QueryCounter() as queries:
+            response = getattr(self.client, method)(url, data)
+        return response.status_code, queries.count
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpSession:
+    """Drive a running server over HTTP; redirects are recorded, not followed, as with the test client."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def request(self, method, url, data):
+        body = None
+        if method == 'post':
+            token = next((c.value for c in self.cookies if c.name == settings.CSRF_COOKIE_NAME), '')
+            body = urllib.parse.urlencode({**data, 'csrfmiddlewaretoken': token}).encode()
+        elif data:
+            url = f"{url}?{urllib.parse.urlencode(data)}"
+
+        request = urllib.request.Request(self.base_url + url, data=body, headers={'Referer': self.base_url + url})
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                response.read()
+                return response.status, self.query_count(response)
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, self.query_count(e)
+
+    @staticmethod
+    def query_count(response):
+        # Sent by QueryProfilerMiddleware when QUERY_PROFILER_HEADERS is on.
+        count = response.headers.get('X-DB-Queries')
+        return int(count) if count is not None else None
+
+
+def run_worker(target, kiosks, item_ids, seed):
+    """Run one lunch-rush flow per ``(employee_id, pin)`` in ``kiosks``; returns per-step samples."""
+    random.seed(seed)
+    steps = {}
+    try:
+        for employee_id, pin in kiosks:
+            session = HttpSession(target) if target else ClientSession()
+            for step, method, url, data in lunch_rush_flow(employee_id, pin, random.sample(item_ids, 2)):
+                samples = steps.setdefault(step, {'latencies': [], 'queries': [], 'statuses': {}, 'errors': 0})
+                started = time.perf_counter()
+                try:
+                    status, queries = session.request(method, url, data)
+                except Exception:
+                    samples['errors'] += 1
+                    continue
+                samples['latencies'].append(time.perf_counter() - started)
+                samples['statuses'][str(status)] = samples['statuses'].get(str(status), 0) + 1
+                if status >= 500:
+                    samples['errors'] += 1
+                if queries is not None:
+                    samples['queries'].append(queries)
+    finally:
+        connections.close_all()
+    return steps
+
+
+def summarize(step, runs, elapsed):
+    latencies = [t for run in runs for t in run.get(step, {}).get('latencies', [])]
+    queries = [q for run in runs for q in run.get(step, {}).get('queries', [])]
+    statuses = {}
+    for run in runs:
+        for status, count in run.get(step, {}).get('statuses', {}).items():
+            statuses[status] = statuses.get(status, 0) + count
+
+    return {
+        'requests': len(latencies),
+        'errors': sum(run.get(step, {}).get('errors', 0) for run in runs),
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+        'p50_ms': percentile(latencies, 0.50),
+        'p90_ms': percentile(latencies, 0.90),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'max_ms': percentile(latencies, 1.0),
+        'queries_mean': round(sum(queries) / len(queries), 2) if queries else None,
+        'queries_max': max(queries) if queries else None,
+        'statuses': statuses,
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay lunch-rush kiosk flows (QR verify, home, add to cart, cart, place_order, order history) "
+        "at a given concurrency and print per-endpoint latency percentiles, throughput and query counts "
+        "as JSON. Without --target the flows run through the test client against a freshly seeded scratch "
+        "database; with --target they hit a running server, which places real orders in its database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', help="Base URL of a running server, e.g. http://127.0.0.1:8000.")
+        parser.add_argument('--concurrency', type=int, default=4, help="Kiosk processes running flows in parallel.")
+        parser.add_argument('--flows', type=int, default=10, help="Flows per kiosk process.")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help="Also write the JSON report to this file.")
+        group = parser.add_argument_group("scratch data (test client mode)")
+        group.add_argument('--employees', type=int, default=200)
+        group.add_argument('--items-per-window', type=int, default=5)
+        group.add_argument('--history-days', type=int, default=60)
+        group.add_argument('--orders-per-day', type=int, default=100)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        if options['target']:
+            report = self.run(options, self.existing_data(options))
+        else:
+            with tempfile.TemporaryDirectory(prefix='canteen-loadtest-') as db_dir, \
+                    override_settings(ALLOWED_HOSTS=['*']), \
+                    scratch_database(name=f"{db_dir}/loadtest.sqlite3"):
+                report = self.run(options, self.seed_data(options))
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
+
+    def seed_data(self, options):
+        self.stderr.write("Seeding scratch database...")
+        items = seed_menu(options['items_per_window'])
+        employees = seed_employees(options['employees'], wallet_amount=Decimal('100000.00'))
+        seed_history(options['history_days'], options['orders_per_day'], employees, items)
+        return self.kiosk_data(employees)
+
+    def existing_data(self, options):
+        employees = list(Employee.objects.order_by('id')[:options['concurrency'] * options['flows']])
+        return self.kiosk_data(employees)
+
+    def kiosk_data(self, employees):
+        item_ids = [item.id for item in menu.current_menu_items() if item.quantity > 0]
+        if len(item_ids) < 2 or not employees:
+            raise CommandError("Need at least one employee and two items on the current menu.")
+        return [(employee.id, employee.pin) for employee in employees], item_ids
+
+    def run(self, options, data):
+        kiosks, item_ids = data
+        concurrency, flows = options['concurrency'], options['flows']
+        assignments = [
+            (
+                options['target'],
+                [kiosks[(worker * flows + n) % len(kiosks)] for n in range(flows)],
+                item_ids,
+                options['seed'] + worker,
+            )
+            for worker in range(concurrency)
+        ]
+
+        self.stderr.write(f"Running {concurrency * flows} flows with {concurrency} kiosk processes...")
+        # Forked workers must open their own connections.
+        connection.close()
+        started_at = timezone.now()
+        started = time.perf_counter()
+        runs = run_in_processes(run_worker, assignments)
+        elapsed = time.perf_counter() - started
+
+        steps = list(dict.fromkeys(step for run in runs for step in run))
+        endpoints = {step: summarize(step, runs, elapsed) for step in steps}
+        requests = sum(endpoint['requests'] for endpoint in endpoints.values())
+        return {
+            'meta': {
+                'commit': current_commit(),
+                'started_at': started_at.isoformat(),
+                'mode': 'http' if options['target'] else 'test-client',
+                'target': options['target'],
+                'concurrency': concurrency,
+                'flows': concurrency * flows,
+                'seed': options['seed'],
+                'menu_items_on_offer': len(item_ids),
+                'data': None if options['target'] else {
+                    key: options[key] for key in ('employees', 'items_per_window', 'history_days', 'orders_per_day')
+                },
+            },
+            'totals': {
+                'elapsed_s': round(elapsed, 2),
+                'requests': requests,
+                'errors': sum(endpoint['errors'] for endpoint in endpoints.values()),
+                'requests_per_second': round(requests / elapsed, 2),
+                'flows_per_second': round(concurrency * flows / elapsed, 2),
+            },
+            'endpoints': endpoints,
+        }
@@ -0,0 +1,31 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+
+from Future import archive, rollups
+from Future.models import Order, DailySalesRollup
+
+
+class Command(BaseCommand):
+    help = "Recompute daily sales rollups from the orders table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('dates', nargs='*', help="Dates to rebuild (YYYY-MM-DD). Defaults to every day.")
+
+    def handle(self, *args, **options):
+        try:
+            dates = [datetime.strptime(value, "%Y-%m-%d").date() for value in options['dates']]
+        except ValueError as e:
+            raise CommandError(e)
+
+        if not dates:
+            dates = set(Order.objects.values_list('order_date', flat=True).distinct())
+            dates |= set(DailySalesRollup.objects.values_list('date', flat=True))
+
+        # Archived days have no orders left to rebuild from; their rollups are all that remains.
+        with_orders = set(Order.objects.filter(order_date__in=dates).values_list('order_date', flat=True))
+        archived = {date for date in dates if date not in with_orders and archive.day_summary(date)}
+        for date in sorted(set(dates) - archived):
+            rollups.rebuild(date)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(dates) - len(archived)} daily rollup(s); skipped {len(archived)} archived day(s)."
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from Future.models import Employee
+from Future.wallet import reconcile
+
+
+class Command(BaseCommand):
+    help = "Check every wallet balance against its ledger and optionally write fresh snapshots."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--snapshot', action='store_true',
+            help="Write a new snapshot for every wallet that matches its ledger.",
+        )
+
+    def handle(self, *args, **options):
+        mismatches = reconcile(snapshot=options['snapshot'])
+        names = dict(Employee.objects.filter(id__in=mismatches).values_list('id', 'name'))
+
+        for employee_id, (wallet_amount, ledger) in sorted(mismatches.items()):
+            self.stdout.write(self.style.WARNING(
+                f"{names.get(employee_id, employee_id)}: wallet ₹{wallet_amount}, ledger ₹{ledger} "
+                f"(difference ₹{wallet_amount - ledger})"
+            ))
+
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f"{len(mismatches)} wallet(s) out of balance."))
+        else:
+            self.stdout.write(self.style.SUCCESS("All wallets match their ledgers."))
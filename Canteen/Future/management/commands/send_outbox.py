@@ -0,0 +1,33 @@
+import time
+from django.core.management.base import BaseCommand
+
+from Future import metrics
+from Future.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Send queued order emails from the outbox, reusing one SMTP connection per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help="Keep polling the outbox instead of exiting when empty.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep between polls with --loop.")
+        parser.add_argument(
+            '--metrics-port', type=int,
+            help="Serve this worker's email metrics in Prometheus format on 127.0.0.1:<port>.",
+        )
+
+    def handle(self, *args, **options):
+        if options['metrics_port']:
+            metrics.serve(options['metrics_port'])
+
+        while True:
+            sent, failed = drain_outbox(batch_size=options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} email(s), {failed} failed.")
+
+            if sent + failed == options['batch_size']:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
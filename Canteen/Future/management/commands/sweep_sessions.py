@@ -0,0 +1,40 @@
+import time
+from django.conf import settings
+from django.utils import timezone
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired database sessions in small batches, so the sweep never "
+        "holds the write lock for long. Safe to run from cron every few minutes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-batches', type=int, default=0, help="Stop after this many batches (0 = until done).")
+        parser.add_argument('--pause', type=float, default=0.05, help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE.endswith('signed_cookies'):
+            self.stdout.write("Signed-cookie sessions are not stored in the database; nothing to sweep.")
+            return
+
+        now = timezone.now()
+        deleted = batches = 0
+        while not options['max_batches'] or batches < options['max_batches']:
+            keys = list(
+                Session.objects
+                .filter(expire_date__lt=now)
+                .values_list('session_key', flat=True)[:options['batch_size']]
+            )
+            if not keys:
+                break
+
+            Session.objects.filter(session_key__in=keys).delete()
+            deleted += len(keys)
+            batches += 1
+            time.sleep(options['pause'])
+
+        self.stdout.write(f"Deleted {deleted} expired session(s) in {batches} batch(es).")
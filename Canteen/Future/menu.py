@@ -0,0 +1,111 @@
+import threading
+from bisect import bisect_right
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+
+from . import versions
+from .models import MenuItem, weekday_bit
+
+# Signals clear this process immediately; other worker processes notice the
+# shared 'menu' version stamp moving once the change has committed.
+
+_lock = threading.Lock()
+_menus = {}
+_generation = 0
+
+
+def _micros(t):
+    return ((t.hour * 60 + t.minute) * 60 + t.second) * 1_000_000 + t.microsecond
+
+
+class DayMenu:
+    """
+    Every item available on one weekday, split into time slots.
+
+    Slot boundaries are the distinct start times and (inclusive) end times,
+    so each slot has a fixed item list and a lookup is one bisect.
+    """
+
+    def __init__(self, items, version=None):
+        windows = [(_micros(item.start_time), _micros(item.end_time), item) for item in items]
+        self.boundaries = sorted({start for start, _, _ in windows} | {end + 1 for _, end, _ in windows})
+        self.slots = [
+            tuple(item for start, end, item in windows if start <= boundary <= end)
+            for boundary in self.boundaries
+        ]
+        self.version = version
+
+    def items_at(self, at):
+        index = bisect_right(self.boundaries, _micros(at)) - 1
+        return self.slots[index] if index >= 0 else ()
+
+    def slot_start(self, at):
+        """Microseconds since midnight at which the slot containing ``at`` began."""
+        index = bisect_right(self.boundaries, _micros(at)) - 1
+        return self.boundaries[index] if index >= 0 else 0
+
+
+def items_on(day):
+    """Items available on weekday ``day``, read from ``weekday_mask`` without joining ``Day``."""
+    bit = weekday_bit(day)
+    if not bit:
+        return MenuItem.objects.none()
+    # A bitwise test can't use an index; the 64 masks that include the day can.
+    return MenuItem.objects.filter(weekday_mask__in=[mask for mask in range(1, 128) if mask & bit])
+
+
+def sync_weekday_masks(item_ids=None):
+    """Recompute ``weekday_mask`` from ``available_days`` for ``item_ids`` (every item when None)."""
+    items = MenuItem.objects.all() if item_ids is None else MenuItem.objects.filter(id__in=item_ids)
+    masks = dict.fromkeys(items.values_list('id', flat=True), 0)
+    days = MenuItem.available_days.through.objects.filter(menuitem_id__in=list(masks))
+    for item_id, name in days.values_list('menuitem_id', 'day__name'):
+        masks[item_id] |= weekday_bit(name)
+
+    stale = [
+        MenuItem(id=item_id, weekday_mask=masks[item_id])
+        for item_id, mask in items.values_list('id', 'weekday_mask')
+        if masks.get(item_id, mask) != mask
+    ]
+    MenuItem.objects.bulk_update(stale, ['weekday_mask'], batch_size=500)
+    return masks
+
+
+def get_day_menu(day):
+    # Read the version before the items so a menu is never stamped newer
+    # than the rows it was built from.
+    [(version, _)] = versions.get_versions('menu')
+    menu = _menus.get(day)
+    if menu is not None and menu.version == version:
+        return menu
+
+    generation = _generation
+    items = items_on(day).order_by('id')
+    menu = DayMenu(list(items), version)
+    with _lock:
+        # Don't publish a menu that was read before a concurrent invalidation.
+        if generation == _generation:
+            _menus[day] = menu
+    return menu
+
+
+def current_menu_items(now=None):
+    now = timezone.localtime(now)
+    return get_day_menu(now.strftime('%A')).items_at(now.time())
+
+
+def current_slot_started(now=None):
+    """When the menu currently on offer last changed because of the clock."""
+    now = timezone.localtime(now)
+    micros = get_day_menu(now.strftime('%A')).slot_start(now.time())
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight + timedelta(microseconds=micros)
+
+
+def invalidate(**kwargs):
+    global _generation
+    with _lock:
+        _generation += 1
+        _menus.clear()
+    transaction.on_commit(lambda: versions.bump('menu'))
@@ -0,0 +1,170 @@
+import time
+import threading
+from bisect import bisect_left
+from functools import wraps
+from asgiref.sync import iscoroutinefunction
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds; tuned for web requests, checkout transactions and SMTP sends.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REGISTRY = []
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter; label values are passed positionally, in ``labelnames`` order."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield self.name + _format_labels(self.labelnames, labels), value
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram, self.labels = histogram, labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus style.
+
+    ``observe`` is a bisect and two additions under a lock; buckets are only
+    made cumulative when the registry is rendered.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self.upper_bounds = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.upper_bounds, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.upper_bounds) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            snapshot = {labels: (list(buckets), total) for labels, (buckets, total) in self._series.items()}
+        for labels, (buckets, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, hits in zip(self.upper_bounds + (float('inf'),), buckets):
+                cumulative += hits
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                yield self.name + '_bucket' + _format_labels(self.labelnames, labels, f'le="{le}"'), cumulative
+            yield self.name + '_sum' + _format_labels(self.labelnames, labels), total
+            yield self.name + '_count' + _format_labels(self.labelnames, labels), cumulative
+
+
+def timed(histogram, *labels):
+    """Decorator observing the wall time of every call of the wrapped function (sync or async)."""
+    def decorator(func):
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with histogram.time(*labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time(*labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format (0.0.4)."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(f"{name} {_format_value(value)}" for name, value in metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port, host='127.0.0.1'):
+    """Expose this process's registry on ``host:port`` from a daemon thread (for non-web workers)."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
+
+
+VIEW_SECONDS = Histogram('canteen_view_seconds', "Time spent in instrumented views.", ['view'])
+ORDERS = Counter('canteen_orders_total', "Orders placed.")
+ORDER_REVENUE = Counter('canteen_order_revenue_rupees_total', "Value of orders placed, in rupees.")
+CHECKOUT_SECONDS = Histogram('canteen_checkout_seconds', "Duration of the checkout transaction.")
+CHECKOUT_REJECTIONS = Counter('canteen_checkout_rejections_total', "Checkouts refused, by reason.", ['reason'])
+EMAIL_SEND_SECONDS = Histogram('canteen_email_send_seconds', "Time to hand an order email to the mail server.")
+EMAILS = Counter('canteen_emails_total', "Order email delivery attempts, by result.", ['result'])
+EMPLOYEE_VERIFICATIONS = Counter('canteen_employee_verifications_total', "PIN checks, by result.", ['result'])
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:36
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_order_dates(apps, schema_editor):
+    Order = apps.get_model('Future', 'Order')
+    DailyOrderCounter = apps.get_model('Future', 'DailyOrderCounter')
+
+    used = {}
+    orders = []
+    for order in Order.objects.order_by('created_at', 'id'):
+        order.order_date = timezone.localdate(order.created_at)
+        numbers = used.setdefault(order.order_date, set())
+        # Concurrent checkouts could hand out the same number twice; move
+        # the later duplicates to the end of that day's sequence.
+        if order.daily_order_number in numbers:
+            order.daily_order_number = max(numbers) + 1
+        numbers.add(order.daily_order_number)
+        orders.append(order)
+
+    Order.objects.bulk_update(orders, ['order_date', 'daily_order_number'], batch_size=500)
+    DailyOrderCounter.objects.bulk_create([
+        DailyOrderCounter(date=date, last_number=max(numbers)) for date, numbers in used.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Future', '0004_delete_payment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOrderCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='order_date',
+            field=models.DateField(default=django.utils.timezone.localdate, editable=False),
+        ),
+        migrations.RunPython(backfill_order_dates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='order',
+            name='daily_order_number',
+            field=models.PositiveIntegerField(blank=True),
+        ),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(fields=('order_date', 'daily_order_number'), name='unique_daily_order_number'),
+        ),
+    ]
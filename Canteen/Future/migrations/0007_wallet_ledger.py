@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:43
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def open_ledgers(apps, schema_editor):
+    # Earlier top-ups and debits were never recorded, so each existing
+    # wallet starts its ledger with its current balance.
+    Employee = apps.get_model('Future', 'Employee')
+    WalletTransaction = apps.get_model('Future', 'WalletTransaction')
+    WalletSnapshot = apps.get_model('Future', 'WalletSnapshot')
+
+    for employee in Employee.objects.exclude(wallet_amount=0):
+        txn = WalletTransaction.objects.create(
+            employee=employee,
+            kind='adjustment',
+            amount=employee.wallet_amount,
+            note="Opening balance",
+        )
+        WalletSnapshot.objects.create(employee=employee, balance=employee.wallet_amount, last_transaction_id=txn.id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Future', '0006_email_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('last_transaction_id', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wallet_snapshots', to='Future.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['employee', '-last_transaction_id'], name='wallet_snapshot_latest_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WalletTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('topup', 'Top-up'), ('debit', 'Debit'), ('adjustment', 'Adjustment')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wallet_transactions', to='Future.employee')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='Future.order')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['employee', 'id'], name='wallet_txn_employee_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledgers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:44
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rollups(apps, schema_editor):
+    Order = apps.get_model('Future', 'Order')
+    CartItem = apps.get_model('Future', 'CartItem')
+    DailySalesRollup = apps.get_model('Future', 'DailySalesRollup')
+
+    for date in Order.objects.values_list('order_date', flat=True).distinct():
+        orders = Order.objects.filter(order_date=date)
+        totals = orders.aggregate(order_count=Count('id'), revenue=Sum('total_amount'))
+        items = (
+            CartItem.objects
+            .filter(order__order_date=date)
+            .values_list('menu_item__name')
+            .annotate(quantity=Sum('quantity'))
+        )
+        departments = orders.values_list('employee__department').annotate(spend=Sum('total_amount'))
+        DailySalesRollup.objects.create(
+            date=date,
+            order_count=totals['order_count'],
+            revenue=totals['revenue'],
+            item_quantities=dict(items),
+            department_spend={name: str(Decimal(spend).quantize(Decimal('0.01'))) for name, spend in departments},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Future', '0007_wallet_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('item_quantities', models.JSONField(default=dict)),
+                ('department_spend', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
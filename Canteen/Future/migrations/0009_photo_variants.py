@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Future', '0008_daily_sales_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Future', '0009_photo_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['employee', '-created_at', '-id'], name='order_employee_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['order_date', 'created_at', 'id'], name='order_day_timeline_idx'),
+        ),
+    ]
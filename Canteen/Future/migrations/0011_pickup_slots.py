@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Future', '0010_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PickupSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('capacity', models.PositiveIntegerField()),
+                ('booked', models.PositiveIntegerField(default=0, editable=False)),
+            ],
+            options={
+                'ordering': ['date', 'start_time'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'start_time'), name='unique_pickup_slot'), models.CheckConstraint(condition=models.Q(('booked__lte', models.F('capacity'))), name='pickup_slot_within_capacity')],
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='pickup_slot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='Future.pickupslot'),
+        ),
+        migrations.CreateModel(
+            name='PickupSlotItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('capacity', models.PositiveIntegerField()),
+                ('booked', models.PositiveIntegerField(default=0, editable=False)),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Future.menuitem')),
+                ('slot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_limits', to='Future.pickupslot')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('slot', 'menu_item'), name='unique_pickup_slot_item'), models.CheckConstraint(condition=models.Q(('booked__lte', models.F('capacity'))), name='pickup_slot_item_within_capacity')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:17
+
+from django.db import migrations, models
+
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+
+def backfill_weekday_masks(apps, schema_editor):
+    MenuItem = apps.get_model('Future', 'MenuItem')
+    Through = MenuItem.available_days.through
+    masks = {}
+    for item_id, name in Through.objects.values_list('menuitem_id', 'day__name'):
+        if name in WEEKDAYS:
+            masks[item_id] = masks.get(item_id, 0) | 1 << WEEKDAYS.index(name)
+    MenuItem.objects.bulk_update(
+        [MenuItem(id=item_id, weekday_mask=mask) for item_id, mask in masks.items()], ['weekday_mask'], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Future', '0011_pickup_slots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='weekday_mask',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['start_time', 'end_time', 'weekday_mask'], name='menuitem_day_window_idx'),
+        ),
+        migrations.RunPython(backfill_weekday_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Future', '0012_weekday_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxemail',
+            name='claim_token',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=32),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Future', '0013_outbox_claim_token'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='menuitem',
+            name='menuitem_day_window_idx',
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['weekday_mask', 'start_time', 'end_time'], name='menuitem_weekday_window_idx'),
+        ),
+    ]
@@ -1,9 +1,18 @@
 import qrcode
 from io import BytesIO
 from datetime import time
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.utils import timezone
-from django.core.files import File
+from django.db.models import F, Q
+from django.core.files.base import ContentFile
+
+
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+
+def weekday_bit(name):
+    """The ``MenuItem.weekday_mask`` bit for a day name, or 0 if it isn't a weekday."""
+    return 1 << WEEKDAYS.index(name) if name in WEEKDAYS else 0
 
 
 class Day(models.Model):
@@ -13,11 +22,22 @@ class Day(models.Model):
         return self.name
 
 
+def render_qr_png(employee_id):
+    # Module-level so bulk imports can render codes in a process pool.
+    base_url = "http://127.0.0.1:8000"  # Replace with your production URL
+    qr_data = f"{base_url}/verify-employee/{employee_id}/"
+    qr = qrcode.make(qr_data)
+    buffer = BytesIO()
+    qr.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
 class Employee(models.Model):
     name = models.CharField(max_length=100)
     email = models.EmailField(unique=True)
     department = models.CharField(max_length=100)
     photo = models.ImageField(upload_to='employee_photos/', null=True, blank=True)
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False)
     pin = models.CharField(max_length=128)
     qr_code = models.ImageField(upload_to='employee_qr/', blank=True, null=True)
     wallet_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
@@ -26,13 +46,8 @@ class Employee(models.Model):
         return self.name
 
     def generate_qr_code(self):
-        base_url = "http://127.0.0.1:8000"  # Replace with your production URL
-        qr_data = f"{base_url}/verify-employee/{self.id}/"
-        qr = qrcode.make(qr_data)
-        buffer = BytesIO()
-        qr.save(buffer, format='PNG')
         filename = f"{self.name}_qr.png"
-        self.qr_code.save(filename, File(buffer), save=False)
+        self.qr_code.save(filename, ContentFile(render_qr_png(self.id)), save=False)
 
     def save(self, *args, **kwargs):
         is_new = not self.pk
@@ -47,10 +62,20 @@ class MenuItem(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=6, decimal_places=2)
     photo = models.ImageField(upload_to='menu_photos/', blank=True, null=True)
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False)
     available_days = models.ManyToManyField(Day)
     start_time = models.TimeField(default=time(0, 0))
     end_time = models.TimeField(default=time(23, 59))
     quantity = models.PositiveIntegerField(default=0)
+    # available_days as bits (Monday = 1 ... Sunday = 64), kept in step by
+    # signals so menu reads don't need the join and distinct.
+    weekday_mask = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Mask first: a day's items are the masks with its bit set, looked up as an IN list.
+            models.Index(fields=['weekday_mask', 'start_time', 'end_time'], name='menuitem_weekday_window_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -60,18 +85,93 @@ class MenuItem(models.Model):
         return self.start_time <= now_time <= self.end_time and self.quantity > 0
 
 
+class DailyOrderCounter(models.Model):
+    date = models.DateField(unique=True)
+    last_number = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.date}: {self.last_number}"
+
+    @classmethod
+    def next_number(cls, date):
+        with transaction.atomic():
+            counter = cls.objects.filter(date=date)
+            if not counter.update(last_number=F('last_number') + 1):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(date=date, last_number=1)
+                    return 1
+                except IntegrityError:
+                    counter.update(last_number=F('last_number') + 1)
+            return counter.values_list('last_number', flat=True).get()
+
+
+class PickupSlot(models.Model):
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    capacity = models.PositiveIntegerField()
+    # Orders booked into the slot, kept up to date at checkout so showing
+    # availability is a single read.
+    booked = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        ordering = ['date', 'start_time']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'start_time'], name='unique_pickup_slot'),
+            models.CheckConstraint(condition=Q(booked__lte=F('capacity')), name='pickup_slot_within_capacity'),
+        ]
+
+    @property
+    def remaining(self):
+        return max(self.capacity - self.booked, 0)
+
+    def __str__(self):
+        return f"{self.date} {self.start_time:%H:%M}-{self.end_time:%H:%M}"
+
+
+class PickupSlotItem(models.Model):
+    """How many of one item the kitchen can have ready for one slot."""
+    slot = models.ForeignKey(PickupSlot, on_delete=models.CASCADE, related_name='item_limits')
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
+    capacity = models.PositiveIntegerField()
+    # Quantity booked, like PickupSlot.booked.
+    booked = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['slot', 'menu_item'], name='unique_pickup_slot_item'),
+            models.CheckConstraint(condition=Q(booked__lte=F('capacity')), name='pickup_slot_item_within_capacity'),
+        ]
+
+    def __str__(self):
+        return f"{self.menu_item} @ {self.slot}: {self.booked}/{self.capacity}"
+
+
 class Order(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
     items = models.ManyToManyField(MenuItem, through='OrderItem')
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(default=timezone.now)
-    daily_order_number = models.PositiveIntegerField(default=1)
+    order_date = models.DateField(default=timezone.localdate, editable=False)
+    daily_order_number = models.PositiveIntegerField(blank=True)
+    pickup_slot = models.ForeignKey(PickupSlot, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order_date', 'daily_order_number'], name='unique_daily_order_number'),
+        ]
+        indexes = [
+            # Order history: one employee's orders, newest first, paged by (created_at, id).
+            models.Index(fields=['employee', '-created_at', '-id'], name='order_employee_history_idx'),
+            # Daily report and admin day views: one day's orders in time order (either direction).
+            models.Index(fields=['order_date', 'created_at', 'id'], name='order_day_timeline_idx'),
+        ]
 
     def save(self, *args, **kwargs):
+        self.order_date = timezone.localdate(self.created_at)
         if not self.daily_order_number:
-            today = timezone.now().date()
-            last_order = Order.objects.filter(created_at__date=today).order_by('-daily_order_number').first()
-            self.daily_order_number = (last_order.daily_order_number + 1) if last_order else 1
+            self.daily_order_number = DailyOrderCounter.next_number(self.order_date)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -99,3 +199,96 @@ class CartItem(models.Model):
 
     def __str__(self):
         return f"{self.menu_item.name} x {self.quantity}"
+
+
+class OutboxEmail(models.Model):
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True)
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    html_body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    # Set by the worker that claimed the email for its current batch.
+    claim_token = models.CharField(max_length=32, blank=True, db_index=True, editable=False)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient} ({self.status})"
+
+
+class WalletTransaction(models.Model):
+    TOPUP = 'topup'
+    DEBIT = 'debit'
+    ADJUSTMENT = 'adjustment'
+    KIND_CHOICES = [
+        (TOPUP, 'Top-up'),
+        (DEBIT, 'Debit'),
+        (ADJUSTMENT, 'Adjustment'),
+    ]
+
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='wallet_transactions')
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'id'], name='wallet_txn_employee_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Wallet transactions are append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Wallet transactions are append-only.")
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.amount} for {self.employee}"
+
+
+class WalletSnapshot(models.Model):
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='wallet_snapshots')
+    balance = models.DecimalField(max_digits=10, decimal_places=2)
+    last_transaction_id = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', '-last_transaction_id'], name='wallet_snapshot_latest_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee}: {self.balance} @ txn {self.last_transaction_id}"
+
+
+class DailySalesRollup(models.Model):
+    date = models.DateField(unique=True)
+    order_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_quantities = models.JSONField(default=dict)
+    department_spend = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.date}: {self.order_count} orders, ₹{self.revenue}"
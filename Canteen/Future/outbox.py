@@ -0,0 +1,110 @@
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from django.core.mail import get_connection, EmailMultiAlternatives
+from django.template.loader import render_to_string
+
+from . import metrics
+from .models import OutboxEmail
+
+MAX_ATTEMPTS = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+BACKOFF_SECONDS = getattr(settings, 'EMAIL_OUTBOX_BACKOFF_SECONDS', 30)
+# How long a claimed batch is held before another worker may take it over,
+# e.g. because the worker that claimed it died mid-send.
+CLAIM_SECONDS = getattr(settings, 'EMAIL_OUTBOX_CLAIM_SECONDS', 300)
+
+
+def queue_order_email(employee, order, cart_items):
+    # Called inside the checkout transaction, so the email only exists if the order does.
+    subject = f"Order Confirmation - Order #{order.daily_order_number} - {order.created_at.strftime('%Y-%m-%d')}"
+    context = {
+        'user': employee,
+        'order': order,
+        'cart_items': cart_items,
+    }
+    return OutboxEmail.objects.create(
+        order=order,
+        recipient=employee.email,
+        subject=subject,
+        html_body=render_to_string('email/order_email.html', context),
+    )
+
+
+@metrics.timed(metrics.EMAIL_SEND_SECONDS)
+def send_order_email(message, connection):
+    email = EmailMultiAlternatives(
+        message.subject,
+        '',
+        None,  # falls back to settings.DEFAULT_FROM_EMAIL
+        [message.recipient],
+        connection=connection,
+    )
+    email.attach_alternative(message.html_body, 'text/html')
+    email.send(fail_silently=False)
+
+
+def backoff_delay(attempts):
+    return timedelta(seconds=BACKOFF_SECONDS * 2 ** (attempts - 1))
+
+
+def record_failure(message, error):
+    metrics.EMAILS.inc('failed')
+    message.attempts += 1
+    message.last_error = str(error)
+    if message.attempts >= MAX_ATTEMPTS:
+        message.status = OutboxEmail.FAILED
+    else:
+        message.next_attempt_at = timezone.now() + backoff_delay(message.attempts)
+    message.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def claim_batch(batch_size):
+    """
+    Claim up to ``batch_size`` due emails for this worker.
+
+    The claim is a single guarded UPDATE, so when several workers drain at
+    once each email goes to exactly one of them. Claimed rows are pushed
+    ``CLAIM_SECONDS`` into the future and come due again if never settled.
+    """
+    now = timezone.now()
+    due = OutboxEmail.objects.filter(status=OutboxEmail.PENDING, next_attempt_at__lte=now)
+    ids = list(due.order_by('next_attempt_at', 'id').values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    due.filter(id__in=ids).update(claim_token=token, next_attempt_at=now + timedelta(seconds=CLAIM_SECONDS))
+    return list(OutboxEmail.objects.filter(claim_token=token).order_by('id'))
+
+
+def drain_outbox(batch_size=50, connection=None):
+    """Send one batch of due emails over a single connection; returns ``(sent, failed)``."""
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        # Nothing could be sent; every claimed email backs off as if its own send failed.
+        for message in batch:
+            record_failure(message, e)
+        return 0, len(batch)
+
+    sent_ids, failed = [], 0
+    try:
+        for message in batch:
+            try:
+                send_order_email(message, connection)
+            except Exception as e:
+                failed += 1
+                record_failure(message, e)
+            else:
+                sent_ids.append(message.id)
+                metrics.EMAILS.inc('sent')
+    finally:
+        connection.close()
+
+    OutboxEmail.objects.filter(id__in=sent_ids).update(status=OutboxEmail.SENT, sent_at=timezone.now())
+    return len(sent_ids), failed
@@ -0,0 +1,179 @@
+import re
+import time
+import logging
+import threading
+from collections import Counter, deque
+from django.conf import settings
+from django.db import connection
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger(__name__)
+
+QUERY_PROFILER_ENABLED = getattr(settings, 'QUERY_PROFILER_ENABLED', True)
+# A query shape repeated this many times in one request is reported as a likely N+1.
+QUERY_PROFILER_REPEAT_THRESHOLD = getattr(settings, 'QUERY_PROFILER_REPEAT_THRESHOLD', 5)
+QUERY_PROFILER_SLOW_MS = getattr(settings, 'QUERY_PROFILER_SLOW_MS', 500)
+# Requests kept per view for the rolling summary.
+QUERY_PROFILER_WINDOW = getattr(settings, 'QUERY_PROFILER_WINDOW', 200)
+QUERY_PROFILER_HEADERS = getattr(settings, 'QUERY_PROFILER_HEADERS', settings.DEBUG)
+
+
+def percentile(samples, fraction):
+    """``fraction`` percentile of ``samples`` (seconds) in milliseconds."""
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return round(samples[min(int(len(samples) * fraction), len(samples) - 1)] * 1000, 1)
+
+
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """The shape of ``sql``: literals and IN lists collapsed, so repeats of one query compare equal."""
+    sql = _LITERAL.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+class RequestProfile:
+    """``execute_wrapper`` that tallies one request's queries."""
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.count += 1
+            self.shapes[fingerprint(sql)] += 1
+
+    def repeated(self, threshold=QUERY_PROFILER_REPEAT_THRESHOLD):
+        return {shape: n for shape, n in self.shapes.most_common() if n >= threshold}
+
+
+class ProfileStore:
+    """Rolling per-view window of request profiles, kept in this process."""
+
+    def __init__(self, window=QUERY_PROFILER_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def add(self, view, duration, profile):
+        sample = (duration, profile.count, profile.db_time, profile.repeated())
+        with self._lock:
+            self._views.setdefault(view, deque(maxlen=self.window)).append(sample)
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+    def summary(self):
+        with self._lock:
+            views = {view: list(samples) for view, samples in self._views.items()}
+
+        rows = []
+        for view, samples in views.items():
+            durations = [duration for duration, _, _, _ in samples]
+            counts = [count for _, count, _, _ in samples]
+            repeated = Counter()
+            for *_, shapes in samples:
+                repeated.update(shapes.keys())
+            rows.append({
+                'view': view,
+                'requests': len(samples),
+                'p50_ms': percentile(durations, 0.50),
+                'p95_ms': percentile(durations, 0.95),
+                'queries_mean': round(sum(counts) / len(counts), 1),
+                'queries_max': max(counts),
+                'db_ms_mean': round(sum(db for _, _, db, _ in samples) / len(samples) * 1000, 1),
+                'n_plus_one_requests': sum(1 for *_, shapes in samples if shapes),
+                'n_plus_one_shapes': repeated.most_common(5),
+            })
+        return sorted(rows, key=lambda row: (row['n_plus_one_requests'], row['queries_mean']), reverse=True)
+
+
+store = ProfileStore()
+
+
+def _add_wrapper(profile):
+    connection.execute_wrappers.append(profile)
+
+
+def _remove_wrapper(profile):
+    connection.execute_wrappers.remove(profile)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return request.path
+    return match.view_name or match._func_path
+
+
+class QueryProfilerMiddleware:
+    """
+    Record query count, DB time and repeated query shapes for every request.
+
+    Requests that repeat a query shape QUERY_PROFILER_REPEAT_THRESHOLD times
+    (a likely N+1) or take longer than QUERY_PROFILER_SLOW_MS are logged;
+    every request feeds the rolling summary on the admin query profile page.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not QUERY_PROFILER_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        profile = RequestProfile()
+        started = time.perf_counter()
+        with connection.execute_wrapper(profile):
+            response = self.get_response(request)
+        return self.record(request, response, profile, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        started = time.perf_counter()
+        # Under ASGI the ORM runs in the request's thread-sensitive worker,
+        # so the wrapper has to go on that thread's connection.
+        await sync_to_async(_add_wrapper)(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_remove_wrapper)(profile)
+        return self.record(request, response, profile, time.perf_counter() - started)
+
+    def record(self, request, response, profile, duration):
+        view = view_name(request)
+        store.add(view, duration, profile)
+
+        for shape, n in profile.repeated().items():
+            logger.warning("Likely N+1 in %s: %d x %s", view, n, shape)
+        if duration * 1000 >= QUERY_PROFILER_SLOW_MS:
+            logger.warning(
+                "Slow request %s %s (%s): %.0f ms, %d queries, %.0f ms in the database",
+                request.method, request.path, view, duration * 1000, profile.count, profile.db_time * 1000,
+            )
+
+        if QUERY_PROFILER_HEADERS:
+            response['X-DB-Queries'] = str(profile.count)
+            response['X-DB-Time-Ms'] = f"{profile.db_time * 1000:.1f}"
+        return response
@@ -0,0 +1,117 @@
+import os
+import time
+import uuid
+import hashlib
+from io import BytesIO
+from pathlib import Path
+from datetime import datetime
+from django.conf import settings
+from django.db.models import Count, Max, Prefetch, Sum
+from django.core.files.storage import default_storage
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+from . import archive
+from .models import Order, CartItem
+
+REPORT_DIR = 'reports'
+REPORT_PRUNE_AFTER_SECONDS = getattr(settings, 'REPORT_PRUNE_AFTER_SECONDS', 60)
+
+
+def daily_orders(date):
+    return (
+        Order.objects
+        .filter(order_date=date)
+        .select_related('employee')
+        .prefetch_related(Prefetch('cartitem_set', queryset=CartItem.objects.select_related('menu_item').order_by('id')))
+        .order_by('created_at', 'id')
+    )
+
+
+def report_rows(orders):
+    rows = []
+    for order in orders:
+        items = ", ".join([f"{item.menu_item.name} × {item.quantity}" for item in order.cartitem_set.all()])
+        time = order.created_at.strftime('%I:%M %p')
+        rows.append([order.employee.name, items, f"₹{order.total_amount}", time])
+    return rows
+
+
+def archived_report_rows(records):
+    rows = []
+    for record in records:
+        items = ", ".join([f"{item['name']} × {item['quantity']}" for item in record['items']])
+        time = datetime.fromisoformat(record['created_at']).strftime('%I:%M %p')
+        rows.append([record['employee'], items, f"₹{record['total_amount']}", time])
+    return rows
+
+
+def render_daily_report(date, rows, stream):
+    doc = SimpleDocTemplate(stream, pagesize=A4)
+    elements = []
+    styles = getSampleStyleSheet()
+    elements.append(Paragraph(f"📝 Daily Report for {date.strftime('%d-%m-%Y')}", styles['Title']))
+    elements.append(Spacer(1, 12))
+
+    data = [['Employee', 'Items Ordered', 'Total Amount', 'Time']] + rows
+
+    table = Table(data, hAlign='LEFT', colWidths=[120, 220, 80, 80])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ]))
+
+    elements.append(table)
+    doc.build(elements)
+
+
+def report_fingerprint(date):
+    # Any order added, removed or re-priced on that day changes one of these.
+    stats = Order.objects.filter(order_date=date).aggregate(
+        orders=Count('id', distinct=True),
+        last_id=Max('id'),
+        revenue=Sum('total_amount'),
+        lines=Count('cartitem'),
+    )
+    key = "|".join(str(stats[k]) for k in ('orders', 'last_id', 'revenue', 'lines'))
+    if not stats['orders']:
+        # Days of archived months are fingerprinted from the archive's manifest.
+        summary = archive.day_summary(date)
+        if summary:
+            key = "archive|" + "|".join(str(summary[k]) for k in ('orders', 'last_id', 'revenue', 'lines'))
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def daily_report_path(date):
+    """Return the storage path of the PDF for ``date``, rendering it only if the day's orders changed."""
+    prefix = f"daily_report_{date.isoformat()}_"
+    path = f"{REPORT_DIR}/{prefix}{report_fingerprint(date)}.pdf"
+    if default_storage.exists(path):
+        return path
+
+    buffer = BytesIO()
+    rows = report_rows(daily_orders(date)) or archived_report_rows(archive.read_day(date))
+    render_daily_report(date, rows, buffer)
+
+    # Written under a temporary name and renamed into place, so a concurrent
+    # request never sees a half-written file or loses one to another's cleanup.
+    target = Path(default_storage.path(path))
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(f".{target.name}.{uuid.uuid4().hex}")
+    partial.write_bytes(buffer.getvalue())
+    os.replace(partial, target)
+
+    # Older fingerprints go once they can no longer be in use by a request still serving them.
+    cutoff = time.time() - REPORT_PRUNE_AFTER_SECONDS
+    for stale in target.parent.glob(f"{prefix}*.pdf"):
+        if stale != target and stale.stat().st_mtime < cutoff:
+            stale.unlink(missing_ok=True)
+    return path
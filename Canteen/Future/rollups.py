@@ -0,0 +1,49 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from . import versions
+from .models import Order, CartItem, DailySalesRollup
+
+
+def record_order(order, lines):
+    """Fold a new order into its day's rollup; call inside the checkout transaction."""
+    rollup, _ = DailySalesRollup.objects.select_for_update().get_or_create(date=order.order_date)
+    rollup.order_count += 1
+    rollup.revenue += order.total_amount
+
+    for item, qty in lines:
+        rollup.item_quantities[item.name] = rollup.item_quantities.get(item.name, 0) + qty
+
+    department = order.employee.department
+    spend = Decimal(rollup.department_spend.get(department, '0')) + order.total_amount
+    rollup.department_spend[department] = str(spend)
+    rollup.save()
+    transaction.on_commit(lambda: versions.bump(f"orders-day:{order.order_date}"))
+
+
+def rebuild(date):
+    """Recompute one day's rollup from its orders; used after deletes and for backfills."""
+    # Orders only disappear through here, so every employee's history may have changed too.
+    transaction.on_commit(lambda: versions.bump('orders', f"orders-day:{date}"))
+    orders = Order.objects.filter(order_date=date)
+    totals = orders.aggregate(order_count=Count('id'), revenue=Sum('total_amount'))
+    if not totals['order_count']:
+        DailySalesRollup.objects.filter(date=date).delete()
+        return None
+
+    items = (
+        CartItem.objects
+        .filter(order__order_date=date)
+        .values_list('menu_item__name')
+        .annotate(quantity=Sum('quantity'))
+    )
+    departments = orders.values_list('employee__department').annotate(spend=Sum('total_amount'))
+
+    rollup, _ = DailySalesRollup.objects.update_or_create(date=date, defaults={
+        'order_count': totals['order_count'],
+        'revenue': totals['revenue'],
+        'item_quantities': dict(items),
+        'department_spend': {name: str(Decimal(spend).quantize(Decimal('0.01'))) for name, spend in departments},
+    })
+    return rollup
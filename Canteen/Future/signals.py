@@ -1,9 +1,68 @@
-from .models import Employee
+from . import menu, images, rollups, versions
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from .models import Day, MenuItem, Employee
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+
+@receiver(post_save, sender=Day)
+@receiver(post_delete, sender=Day)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+@receiver(m2m_changed, sender=MenuItem.available_days.through)
+def invalidate_menu(sender, **kwargs):
+    menu.invalidate()
+
+
+@receiver(m2m_changed, sender=MenuItem.available_days.through)
+def sync_weekday_mask(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        instance.weekday_mask = menu.sync_weekday_masks([instance.pk])[instance.pk]
+    else:
+        # Changed from the Day side; a clear doesn't say which items it touched.
+        menu.sync_weekday_masks(pk_set if action != 'post_clear' else None)
+
+
+@receiver(post_save, sender=Day)
+@receiver(post_delete, sender=Day)
+def resync_weekday_masks(sender, created=False, **kwargs):
+    # A renamed or deleted day changes the mask of every item on it; a new one has none yet.
+    if not created:
+        menu.sync_weekday_masks()
+
 
 @receiver(post_save, sender=Employee)
-def generate_qr(sender, instance, created, **kwargs):
-    if created and not instance.qr_code:
-        instance.generate_qr_code()
-        instance.save()
+@receiver(post_delete, sender=Employee)
+def bump_employee_version(sender, instance, **kwargs):
+    transaction.on_commit(lambda: versions.bump(f"employee:{instance.pk}"))
+
+
+@receiver(pre_delete, sender=Employee)
+def remember_order_dates(sender, instance, **kwargs):
+    instance._order_dates = set(instance.order_set.values_list('order_date', flat=True))
+
+
+@receiver(post_delete, sender=Employee)
+def rebuild_rollups_after_cascade(sender, instance, **kwargs):
+    # The employee's orders went with them; their days' rollups have to follow.
+    for date in getattr(instance, '_order_dates', ()):
+        rollups.rebuild(date)
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_save, sender=MenuItem)
+def build_photo_derivatives(sender, instance, **kwargs):
+    if images.needs_derivatives(instance):
+        images.schedule(instance)
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    # Straight on the DB-API connection so the pragmas never show up as queries.
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.utils import timezone
+from django.db.models import F, OuterRef, Subquery, Sum, Count
+from django.db.models.functions import Coalesce
+
+from . import menu
+from .models import Order, CartItem, PickupSlot, PickupSlotItem
+
+PICKUP_SLOT_MINUTES = getattr(settings, 'PICKUP_SLOT_MINUTES', 15)
+PICKUP_SLOT_CAPACITY = getattr(settings, 'PICKUP_SLOT_CAPACITY', 40)
+# Slots stop taking orders this long before they start, so the kitchen has time to prepare.
+PICKUP_SLOT_LEAD_MINUTES = getattr(settings, 'PICKUP_SLOT_LEAD_MINUTES', 10)
+
+
+def bookable(now=None):
+    """Slots that can still be booked at ``now``: today's, far enough ahead and not full."""
+    now = timezone.localtime(now)
+    cutoff = now + timedelta(minutes=PICKUP_SLOT_LEAD_MINUTES)
+    if cutoff.date() != now.date():
+        return PickupSlot.objects.none()
+    return PickupSlot.objects.filter(date=now.date(), start_time__gte=cutoff.time(), booked__lt=F('capacity'))
+
+
+def open_slots(now=None):
+    return list(bookable(now).order_by('start_time'))
+
+
+def generate(date, start, end, minutes=PICKUP_SLOT_MINUTES, capacity=PICKUP_SLOT_CAPACITY, item_capacity=None):
+    """
+    Create ``date``'s slots of ``minutes`` between ``start`` and ``end``.
+
+    Slots that already exist keep their capacity and bookings. With
+    ``item_capacity``, every item on that weekday's menu whose window covers
+    a slot gets a per-slot limit too. Returns the number of slots created.
+    """
+    step = timedelta(minutes=minutes)
+    slots = []
+    at, last = datetime.combine(date, start), datetime.combine(date, end)
+    while at + step <= last:
+        slots.append(PickupSlot(date=date, start_time=at.time(), end_time=(at + step).time(), capacity=capacity))
+        at += step
+    existing = set(PickupSlot.objects.filter(date=date).values_list('start_time', flat=True))
+    PickupSlot.objects.bulk_create([slot for slot in slots if slot.start_time not in existing])
+
+    if item_capacity:
+        items = list(menu.items_on(date.strftime('%A')))
+        day_slots = PickupSlot.objects.filter(date=date, start_time__gte=start, end_time__lte=end)
+        PickupSlotItem.objects.bulk_create(
+            [
+                PickupSlotItem(slot=slot, menu_item=item, capacity=item_capacity)
+                for slot in day_slots
+                for item in items
+                if item.start_time <= slot.start_time and slot.end_time <= item.end_time
+            ],
+            ignore_conflicts=True,
+        )
+    return len(slots) - len(existing & {slot.start_time for slot in slots})
+
+
+def recount(date):
+    """Recompute ``date``'s booked counters from its orders, e.g. after orders are deleted."""
+    orders = Order.objects.filter(pickup_slot=OuterRef('pk')).values('pickup_slot').annotate(n=Count('id'))
+    PickupSlot.objects.filter(date=date).update(booked=Coalesce(Subquery(orders.values('n')), 0))
+
+    quantities = (
+        CartItem.objects
+        .filter(order__pickup_slot=OuterRef('slot'), menu_item=OuterRef('menu_item'))
+        .values('menu_item')
+        .annotate(n=Sum('quantity'))
+    )
+    PickupSlotItem.objects.filter(slot__date=date).update(booked=Coalesce(Subquery(quantities.values('n')), 0))
@@ -0,0 +1,10 @@
+from django import template
+
+from Future import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(instance, size, **attrs):
+    return images.picture_html(instance, size, **attrs)
@@ -1,3 +1,1236 @@
-from django.test import TestCase
+import sys
+import json
+import time
+import shutil
+import asyncio
+import tempfile
+import threading
+from io import BytesIO, StringIO
+from unittest import mock
+from PIL import Image
+from importlib import import_module
+from asgiref.sync import sync_to_async
+from decimal import Decimal
+from datetime import date, datetime, timedelta, time as dtime
+from django.core import mail
+from django.core.management import call_command, CommandError
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, connections, OperationalError
+from django.test.utils import CaptureQueriesContext
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
 
-# Create your tests here.
+from . import menu, slots, images, outbox, archive, kitchen, wallet, metrics, reports, rollups, checkout, versions, profiling
+from .benchmarking import lunch_rush_flow, seed_employees, seed_menu, seed_menu_items, seed_orders
+from .cart import Cart
+from .outbox import drain_outbox
+from .models import (
+    Day, MenuItem, Order, Employee, CartItem, OutboxEmail, PickupSlot, PickupSlotItem, WalletSnapshot,
+    WalletTransaction, DailySalesRollup,
+)
+
+TEST_MEDIA_ROOT = tempfile.mkdtemp(prefix='canteen-test-media-')
+# The file-based carts, sessions and versions caches live in the repo tree; tests keep them in memory.
+TEST_CACHES = {
+    alias: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': f'canteen-test-{alias}',
+        'TIMEOUT': config.get('TIMEOUT', 300),
+    }
+    for alias, config in settings.CACHES.items()
+}
+test_caches = override_settings(CACHES=TEST_CACHES)
+
+
+def setUpModule():
+    test_caches.enable()
+
+
+def tearDownModule():
+    test_caches.disable()
+    shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create(
+            name='Asha', email='asha@example.com', department='Ops', pin='1234', wallet_amount=Decimal('100.00')
+        )
+        self.dosa = MenuItem.objects.create(name='Dosa', description='', price=Decimal('30.00'), quantity=5)
+        self.tea = MenuItem.objects.create(name='Tea', description='', price=Decimal('10.00'), quantity=1)
+
+    def test_place_order_deducts_stock_and_wallet(self):
+        lines, missing = checkout.resolve_cart({str(self.dosa.id): 2, str(self.tea.id): 1, '999': 1})
+        self.assertEqual(missing, ['999'])
+
+        order = checkout.place_order(self.employee, lines)
+
+        self.dosa.refresh_from_db()
+        self.tea.refresh_from_db()
+        self.employee.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('70.00'))
+        self.assertEqual((self.dosa.quantity, self.tea.quantity), (3, 0))
+        self.assertEqual(self.employee.wallet_amount, Decimal('30.00'))
+        self.assertEqual(CartItem.objects.filter(order=order).count(), 2)
+
+    def test_failed_stock_guard_rolls_back_whole_order(self):
+        lines, _ = checkout.resolve_cart({str(self.dosa.id): 1, str(self.tea.id): 2})
+
+        with self.assertRaises(checkout.OutOfStock) as ctx:
+            checkout.place_order(self.employee, lines)
+
+        self.assertEqual(ctx.exception.item, self.tea)
+        self.dosa.refresh_from_db()
+        self.employee.refresh_from_db()
+        self.assertEqual(self.dosa.quantity, 5)
+        self.assertEqual(self.employee.wallet_amount, Decimal('100.00'))
+        self.assertFalse(Order.objects.exists())
+
+    def test_out_of_stock_names_the_short_line(self):
+        self.dosa.quantity = 5
+        self.dosa.save()
+        lines, _ = checkout.resolve_cart({str(self.dosa.id): 3, str(self.tea.id): 2})
+
+        with self.assertRaises(checkout.OutOfStock) as ctx:
+            checkout.place_order(self.employee, lines)
+
+        self.assertEqual((ctx.exception.item, ctx.exception.available), (self.tea, 1))
+        self.dosa.refresh_from_db()
+        self.assertEqual(self.dosa.quantity, 5)
+
+    def test_failed_wallet_guard_restores_stock(self):
+        lines, _ = checkout.resolve_cart({str(self.dosa.id): 4})
+
+        with self.assertRaises(checkout.InsufficientBalance):
+            checkout.place_order(self.employee, lines)
+
+        self.dosa.refresh_from_db()
+        self.assertEqual(self.dosa.quantity, 5)
+        self.assertFalse(Order.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class PickupSlotTests(TestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create(
+            name='Dev', email='dev@example.com', department='Ops', pin='1234', wallet_amount=Decimal('100.00')
+        )
+        self.dosa = MenuItem.objects.create(
+            name='Dosa', description='', price=Decimal('30.00'), quantity=10,
+            start_time=dtime(11, 0), end_time=dtime(23, 59, 59),
+        )
+        self.dosa.available_days.add(Day.objects.create(name=timezone.localtime().strftime('%A')))
+        # Late enough to still be bookable whenever the suite runs, bar the last few minutes of the day.
+        self.slot = PickupSlot.objects.create(
+            date=timezone.localdate(), start_time=dtime(23, 45), end_time=dtime(23, 59), capacity=1
+        )
+
+    def book(self, qty=1):
+        return checkout.place_order(self.employee, [(self.dosa, qty)], pickup_slot=self.slot.id)
+
+    def test_full_slot_rejects_without_charging(self):
+        if not slots.bookable().filter(pk=self.slot.pk).exists():
+            self.skipTest("Too close to midnight for a bookable slot.")
+        order = self.book()
+        self.assertEqual(order.pickup_slot, self.slot)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.booked, 1)
+        self.assertEqual(slots.open_slots(), [])
+
+        with self.assertRaises(checkout.SlotUnavailable):
+            self.book()
+        self.employee.refresh_from_db()
+        self.dosa.refresh_from_db()
+        self.assertEqual(self.employee.wallet_amount, Decimal('70.00'))
+        self.assertEqual(self.dosa.quantity, 9)
+
+    def test_item_limit_is_per_slot(self):
+        if not slots.bookable().filter(pk=self.slot.pk).exists():
+            self.skipTest("Too close to midnight for a bookable slot.")
+        PickupSlotItem.objects.create(slot=self.slot, menu_item=self.dosa, capacity=2)
+
+        with self.assertRaises(checkout.SlotItemFull) as ctx:
+            self.book(qty=3)
+        self.assertEqual(ctx.exception.available, 2)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.booked, 0)
+
+        self.book(qty=2)
+        self.assertEqual(PickupSlotItem.objects.get().booked, 2)
+
+    def test_generate_is_idempotent_and_caps_items(self):
+        day = timezone.localdate()
+        self.assertEqual(slots.generate(day, dtime(12, 0), dtime(13, 0), minutes=15, item_capacity=5), 4)
+        self.assertEqual(slots.generate(day, dtime(12, 0), dtime(13, 0), minutes=15, item_capacity=5), 0)
+        self.assertEqual(PickupSlotItem.objects.filter(slot__date=day, capacity=5).count(), 4)
+
+    def test_recount_after_deleting_orders(self):
+        order = Order.objects.create(employee=self.employee, total_amount=Decimal('30.00'), pickup_slot=self.slot)
+        CartItem.objects.create(employee=self.employee, menu_item=self.dosa, quantity=2, order=order)
+        PickupSlotItem.objects.create(slot=self.slot, menu_item=self.dosa, capacity=5)
+        slots.recount(self.slot.date)
+        self.slot.refresh_from_db()
+        self.assertEqual((self.slot.booked, PickupSlotItem.objects.get().booked), (1, 2))
+
+        order.delete()
+        slots.recount(self.slot.date)
+        self.slot.refresh_from_db()
+        self.assertEqual((self.slot.booked, PickupSlotItem.objects.get().booked), (0, 0))
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class WalletLedgerTests(TestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create(
+            name='Meena', email='meena@example.com', department='Ops', pin='4321'
+        )
+        wallet.adjust_balance(self.employee, Decimal('200.00'))
+        self.item = MenuItem.objects.create(name='Vada', description='', price=Decimal('15.00'), quantity=10)
+
+    def test_checkout_appends_debit_linked_to_order(self):
+        order = checkout.place_order(self.employee, [(self.item, 2)])
+
+        debit = WalletTransaction.objects.get(kind=WalletTransaction.DEBIT)
+        self.assertEqual((debit.order, debit.amount), (order, Decimal('-30.00')))
+        self.assertEqual(wallet.ledger_balance(self.employee), Decimal('170.00'))
+        self.assertEqual(wallet.reconcile(), {})
+
+    def test_snapshot_plus_tail_matches_wallet(self):
+        wallet.reconcile(snapshot=True)
+        snapshot = WalletSnapshot.objects.get()
+        self.assertEqual(snapshot.balance, Decimal('200.00'))
+
+        checkout.place_order(self.employee, [(self.item, 1)])
+        wallet.adjust_balance(self.employee, Decimal('-5.00'), WalletTransaction.ADJUSTMENT)
+        self.assertEqual(wallet.ledger_balance(self.employee), Decimal('180.00'))
+        self.assertEqual(wallet.reconcile(), {})
+
+    def test_reconcile_reports_untracked_changes(self):
+        Employee.objects.filter(pk=self.employee.pk).update(wallet_amount=Decimal('999.00'))
+        self.assertEqual(wallet.reconcile(), {self.employee.pk: (Decimal('999.00'), Decimal('200.00'))})
+
+    def test_ledger_rows_are_append_only(self):
+        txn = WalletTransaction.objects.get()
+        with self.assertRaises(ValueError):
+            txn.save()
+        with self.assertRaises(ValueError):
+            txn.delete()
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.ops = Employee.objects.create(
+            name='Arun', email='arun@example.com', department='Ops', pin='1', wallet_amount=Decimal('500.00')
+        )
+        self.hr = Employee.objects.create(
+            name='Divya', email='divya@example.com', department='HR', pin='2', wallet_amount=Decimal('500.00')
+        )
+        self.tea = MenuItem.objects.create(name='Tea', description='', price=Decimal('12.00'), quantity=50)
+        self.meals = MenuItem.objects.create(name='Meals', description='', price=Decimal('70.00'), quantity=50)
+
+    def test_incremental_rollup_matches_rebuild(self):
+        checkout.place_order(self.ops, [(self.tea, 2), (self.meals, 1)])
+        order = checkout.place_order(self.hr, [(self.tea, 1)])
+        checkout.place_order(self.ops, [(self.meals, 1)])
+
+        rollup = DailySalesRollup.objects.get(date=order.order_date)
+        self.assertEqual((rollup.order_count, rollup.revenue), (3, Decimal('176.00')))
+        self.assertEqual(rollup.item_quantities, {'Tea': 3, 'Meals': 2})
+        self.assertEqual(rollup.department_spend, {'Ops': '164.00', 'HR': '12.00'})
+
+        rebuilt = rollups.rebuild(order.order_date)
+        self.assertEqual(
+            (rebuilt.order_count, rebuilt.revenue, rebuilt.item_quantities, rebuilt.department_spend),
+            (rollup.order_count, rollup.revenue, rollup.item_quantities, rollup.department_spend),
+        )
+
+    def test_rebuild_after_deleting_last_order_drops_the_day(self):
+        order = checkout.place_order(self.ops, [(self.tea, 1)])
+        order.delete()
+        rollups.rebuild(order.order_date)
+        self.assertFalse(DailySalesRollup.objects.exists())
+
+    def test_order_added_in_admin_updates_the_rollup(self):
+        self.client.force_login(User.objects.create_superuser('boss', password='x'))
+        now = timezone.localtime()
+        response = self.client.post('/admin/Future/order/add/', {
+            'employee': self.hr.id,
+            'total_amount': '40.00',
+            'created_at_0': now.strftime('%Y-%m-%d'),
+            'created_at_1': now.strftime('%H:%M:%S'),
+            'daily_order_number': '',
+            'pickup_slot': '',
+        })
+
+        self.assertEqual(response.status_code, 302)
+        rollup = DailySalesRollup.objects.get(date=now.date())
+        self.assertEqual((rollup.order_count, rollup.revenue), (1, Decimal('40.00')))
+        self.assertEqual(rollup.department_spend, {'HR': '40.00'})
+
+    def test_deleting_an_employee_drops_their_orders_from_the_rollup(self):
+        checkout.place_order(self.ops, [(self.tea, 1)])
+        order = checkout.place_order(self.hr, [(self.meals, 1)])
+
+        self.hr.delete()
+
+        rollup = DailySalesRollup.objects.get(date=order.order_date)
+        self.assertEqual((rollup.order_count, rollup.revenue), (1, Decimal('12.00')))
+        self.assertEqual(rollup.department_spend, {'Ops': '12.00'})
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class BulkImportEmployeesTests(TestCase):
+    def import_csv(self, text):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', dir=TEST_MEDIA_ROOT, delete=False) as f:
+            f.write(text)
+        out = StringIO()
+        call_command('bulk_import_employees', f.name, '--workers', '1', stdout=out)
+        return out.getvalue()
+
+    def test_import_skips_duplicates_and_writes_qr_codes(self):
+        Employee.objects.create(name='Old', email='Old@Example.com', department='HR', pin='9', wallet_amount=0)
+
+        output = self.import_csv(
+            "name,email,department,pin,wallet_amount\n"
+            " Nila ,Nila@Example.com,Ops,1234,150.00\n"
+            "Nila again,nila@example.com,Ops,1234,\n"
+            "Old twin,old@example.com,HR,1,\n"
+            "Omar,omar@example.com,IT,4321,\n"
+        )
+
+        self.assertIn("Imported 2 employee(s), skipped 2", output)
+        nila = Employee.objects.get(email='nila@example.com')
+        self.assertEqual((nila.name, nila.wallet_amount), ('Nila', Decimal('150.00')))
+        self.assertEqual(
+            list(WalletTransaction.objects.filter(employee=nila).values_list('kind', 'amount')),
+            [(WalletTransaction.TOPUP, Decimal('150.00'))],
+        )
+        for employee in Employee.objects.filter(email__in=['nila@example.com', 'omar@example.com']):
+            self.assertTrue(employee.qr_code and default_storage.exists(employee.qr_code.name))
+
+    def test_bad_rows_stop_the_import(self):
+        with self.assertRaisesMessage(CommandError, "missing column(s): pin"):
+            self.import_csv("name,email,department\nA,a@example.com,Ops\n")
+        with self.assertRaisesMessage(CommandError, "Line 2: invalid wallet_amount"):
+            self.import_csv("name,email,department,pin,wallet_amount\nA,a@example.com,Ops,1,lots\n")
+        self.assertFalse(Employee.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class DailyReportCacheTests(TestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create(
+            name='Kiran', email='kiran@example.com', department='IT', pin='1', wallet_amount=Decimal('200.00')
+        )
+        self.item = MenuItem.objects.create(name='Upma', description='', price=Decimal('20.00'), quantity=20)
+        self.order = checkout.place_order(self.employee, [(self.item, 1)])
+        self.day = self.order.order_date
+
+    def test_second_request_reuses_the_rendered_file(self):
+        path = reports.daily_report_path(self.day)
+        with mock.patch.object(reports, 'render_daily_report') as render:
+            self.assertEqual(reports.daily_report_path(self.day), path)
+        render.assert_not_called()
+
+    def test_order_edit_renders_a_new_file_and_prunes_the_old_one(self):
+        first = reports.daily_report_path(self.day)
+        Order.objects.filter(pk=self.order.pk).update(total_amount=Decimal('25.00'))
+
+        with mock.patch.object(reports, 'REPORT_PRUNE_AFTER_SECONDS', 3600):
+            second = reports.daily_report_path(self.day)
+        self.assertNotEqual(second, first)
+        # Still inside the grace period, in case a request is serving it.
+        self.assertTrue(default_storage.exists(first))
+
+        Order.objects.filter(pk=self.order.pk).update(total_amount=Decimal('30.00'))
+        with mock.patch.object(reports, 'REPORT_PRUNE_AFTER_SECONDS', -1):
+            third = reports.daily_report_path(self.day)
+        self.assertTrue(default_storage.exists(third))
+        self.assertFalse(default_storage.exists(first))
+        self.assertFalse(default_storage.exists(second))
+        self.assertEqual(
+            [name for name in default_storage.listdir('reports')[1] if name.startswith('.')], [],
+        )
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir=TEST_MEDIA_ROOT)
+        self.employee = Employee.objects.create(
+            name='Meera', email='meera@example.com', department='Ops', pin='1', wallet_amount=Decimal('500.00')
+        )
+        self.tea = MenuItem.objects.create(name='Tea', description='', price=Decimal('12.00'), quantity=50)
+        self.meals = MenuItem.objects.create(name='Meals', description='', price=Decimal('70.00'), quantity=50)
+
+    def _order_on(self, day, lines):
+        order = checkout.place_order(self.employee, lines)
+        Order.objects.filter(id=order.id).update(order_date=day)
+        rollups.rebuild(day)
+        return order
+
+    def test_archive_month_writes_verifies_and_purges(self):
+        old_day, recent_day = date(2025, 1, 10), date(2025, 3, 4)
+        first = self._order_on(old_day, [(self.tea, 2), (self.meals, 1)])
+        self._order_on(date(2025, 1, 20), [(self.tea, 1)])
+        recent = self._order_on(recent_day, [(self.meals, 1)])
+
+        months = archive.months_before(date(2025, 2, 1))
+        self.assertEqual(months, [date(2025, 1, 1)])
+        path, archived, purged = archive.archive_month(months[0], chunk_size=1, batch_size=1, directory=self.directory)
+
+        self.assertEqual((archived, purged), (2, 2))
+        records = archive.read_day(old_day, self.directory)
+        self.assertEqual([record['id'] for record in records], [first.id])
+        self.assertEqual(records[0]['total_amount'], '94.00')
+        self.assertEqual(
+            [(item['name'], item['quantity']) for item in records[0]['items']], [('Tea', 2), ('Meals', 1)],
+        )
+        self.assertEqual(list(Order.objects.values_list('id', flat=True)), [recent.id])
+        self.assertEqual(CartItem.objects.filter(order__isnull=True).count(), 0)
+        self.assertEqual(CartItem.objects.count(), 1)
+        # History that isn't part of the orders stays behind.
+        self.assertTrue(DailySalesRollup.objects.filter(date=old_day).exists())
+        self.assertEqual(WalletTransaction.objects.filter(employee=self.employee).count(), 3)
+
+        self.assertEqual(
+            archive.day_summary(old_day, self.directory),
+            {'orders': 1, 'last_id': first.id, 'revenue': '94.00', 'lines': 2},
+        )
+        with override_settings(ORDER_ARCHIVE_DIR=self.directory):
+            self.assertEqual(reports.archived_report_rows(records)[0][:3], ['Meera', 'Tea × 2, Meals × 1', '₹94.00'])
+            with mock.patch.object(archive, 'read_month', wraps=archive.read_month) as read_month:
+                path = reports.daily_report_path(old_day)
+                self.assertEqual(read_month.call_count, 1)
+                # A cached report is found from the manifest alone.
+                self.assertEqual(reports.daily_report_path(old_day), path)
+                self.assertEqual(read_month.call_count, 1)
+            self.assertTrue(default_storage.exists(path))
+
+    def test_rerun_merges_late_rows_into_the_month(self):
+        day = date(2025, 1, 10)
+        first = self._order_on(day, [(self.tea, 1)])
+        archive.archive_month(day, directory=self.directory)
+        late = self._order_on(day, [(self.meals, 1)])
+
+        path, archived, purged = archive.archive_month(day, directory=self.directory)
+
+        self.assertEqual((archived, purged), (1, 1))
+        self.assertEqual([record['id'] for record in archive.read_month(path)], [first.id, late.id])
+
+    def test_orders_placed_during_archiving_are_kept(self):
+        day = date(2025, 1, 10)
+        first = self._order_on(day, [(self.tea, 1)])
+        write_month, late = archive.write_month, []
+
+        def write_then_order(*args):
+            written = write_month(*args)
+            late.append(self._order_on(day, [(self.meals, 1)]))
+            return written
+
+        with mock.patch.object(archive, 'write_month', side_effect=write_then_order):
+            path, archived, purged = archive.archive_month(day, directory=self.directory)
+
+        self.assertEqual((archived, purged), (1, 1))
+        self.assertEqual([record['id'] for record in archive.read_month(path)], [first.id])
+        self.assertEqual(list(Order.objects.values_list('id', flat=True)), [late[0].id])
+
+    def test_verify_rejects_a_file_missing_orders(self):
+        day = date(2025, 1, 10)
+        self._order_on(day, [(self.tea, 1)])
+        archive.write_month(day, directory=self.directory)
+        self._order_on(day, [(self.meals, 1)])
+
+        with self.assertRaises(archive.ArchiveError):
+            archive.verify_month(day, self.directory)
+
+    def test_delete_orders_by_date_removes_line_items(self):
+        order = checkout.place_order(self.employee, [(self.tea, 1)])
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+
+        response = self.client.post('/delete-orders-by-date/', {'date': order.order_date.isoformat()})
+
+        self.assertRedirects(response, '/admin/Future/order/', fetch_redirect_response=False)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(CartItem.objects.exists())
+        self.assertFalse(DailySalesRollup.objects.exists())
+
+
+class CartTests(TestCase):
+    def setUp(self):
+        self.tea = MenuItem.objects.create(name='Tea', description='', price=Decimal('10.00'), quantity=5)
+        self.bun = MenuItem.objects.create(name='Bun', description='', price=Decimal('15.00'), quantity=5)
+        self.request = RequestFactory().get('/')
+        self.request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+
+    def test_lines_accumulate_and_are_removed(self):
+        cart = Cart(self.request)
+        cart.add(self.tea.id, 1)
+        cart.add(self.tea.id, 2)
+        cart.add(self.bun.id, 1)
+        cart.remove(self.bun.id)
+        cart.remove(999)
+
+        # A later request reads the same cart back from the cache.
+        lines, missing = Cart(self.request).resolve()
+        self.assertEqual((lines, missing), ([(self.tea, 3)], []))
+
+        cart.clear()
+        self.assertFalse(Cart(self.request))
+
+    def test_changing_the_cart_leaves_the_session_alone(self):
+        Cart(self.request)
+        self.request.session.save()
+        self.request.session.modified = False
+
+        Cart(self.request).add(self.tea.id, 1)
+        self.assertFalse(self.request.session.modified)
+
+    def test_cart_expires_with_the_cache_timeout(self):
+        Cart(self.request).add(self.tea.id, 1)
+        later = time.time() + settings.CACHES['carts']['TIMEOUT'] + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertFalse(Cart(self.request))
+
+
+class SessionCartTests(TestCase):
+    def setUp(self):
+        self.tea = MenuItem.objects.create(name='Tea', description='', price=Decimal('10.00'), quantity=5)
+
+    def cart_names(self, client):
+        return [line['name'] for line in client.get('/api/cart/').json()['items']]
+
+    def test_carts_stay_with_their_session(self):
+        self.client.post(f'/add-to-cart/{self.tea.id}/', {'quantity': 1})
+        other = Client()
+        other.force_login(User.objects.create_user('other', password='x'))
+
+        self.assertEqual(self.cart_names(self.client), ['Tea'])
+        self.assertEqual(self.cart_names(other), [])
+
+        # Logging in rotates the session key but keeps this browser's cart.
+        self.client.force_login(User.objects.create_user('kiosk', password='x'))
+        self.assertEqual(self.cart_names(self.client), ['Tea'])
+        self.assertEqual(self.cart_names(other), [])
+
+        # Logging out flushes the session, and the cart id with it.
+        self.client.post('/logout/')
+        self.assertEqual(self.cart_names(self.client), [])
+
+    def test_sweep_deletes_only_expired_sessions(self):
+        now = timezone.now()
+        Session.objects.bulk_create([
+            Session(session_key=f"expired{n:025d}", session_data='', expire_date=now - timedelta(minutes=1))
+            for n in range(3)
+        ] + [Session(session_key='live' + '0' * 28, session_data='', expire_date=now + timedelta(days=1))])
+
+        out = StringIO()
+        call_command('sweep_sessions', '--batch-size', '2', '--pause', '0', stdout=out)
+
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live' + '0' * 28])
+        self.assertIn("Deleted 3 expired session(s) in 2 batch(es)", out.getvalue())
+
+
+class MenuCacheTests(TestCase):
+    def setUp(self):
+        menu.invalidate()
+        self.monday = Day.objects.create(name='Monday')
+        self.breakfast = MenuItem.objects.create(
+            name='Idli', description='', price=Decimal('20.00'), quantity=5,
+            start_time=dtime(7, 0), end_time=dtime(10, 30),
+        )
+        self.lunch = MenuItem.objects.create(
+            name='Meals', description='', price=Decimal('60.00'), quantity=5,
+            start_time=dtime(10, 30), end_time=dtime(14, 0),
+        )
+        self.breakfast.available_days.add(self.monday)
+        self.lunch.available_days.add(self.monday)
+
+    def at(self, hour, minute=0):
+        # 2025-08-11 was a Monday.
+        return timezone.make_aware(datetime(2025, 8, 11, hour, minute))
+
+    def test_items_follow_time_windows(self):
+        self.assertEqual(menu.current_menu_items(self.at(6, 59)), ())
+        self.assertEqual(menu.current_menu_items(self.at(8)), (self.breakfast,))
+        self.assertEqual(menu.current_menu_items(self.at(10, 30)), (self.breakfast, self.lunch))
+        self.assertEqual(menu.current_menu_items(self.at(14)), (self.lunch,))
+        self.assertEqual(menu.current_menu_items(self.at(14, 1)), ())
+
+    def test_cached_menu_needs_no_queries_until_invalidated(self):
+        menu.current_menu_items(self.at(8))
+        with self.assertNumQueries(0):
+            menu.current_menu_items(self.at(12))
+
+        self.lunch.available_days.remove(self.monday)
+        with self.assertNumQueries(1):
+            self.assertEqual(menu.current_menu_items(self.at(12)), ())
+
+    def test_weekday_mask_follows_available_days(self):
+        self.assertEqual(self.breakfast.weekday_mask, 1)
+        friday = Day.objects.create(name='Friday')
+        friday.menuitem_set.add(self.lunch)
+        self.lunch.refresh_from_db()
+        self.assertEqual(self.lunch.weekday_mask, 1 | 16)
+
+        self.lunch.available_days.clear()
+        self.assertEqual(self.lunch.weekday_mask, 0)
+        self.monday.name = 'Tuesday'
+        self.monday.save()
+        self.breakfast.refresh_from_db()
+        self.assertEqual(self.breakfast.weekday_mask, 2)
+
+        self.monday.delete()
+        self.breakfast.refresh_from_db()
+        self.assertEqual(self.breakfast.weekday_mask, 0)
+
+    def test_day_menu_reads_one_table(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(list(menu.items_on('Monday').order_by('id')), [self.breakfast, self.lunch])
+        self.assertEqual(list(menu.items_on('Tuesday')), [])
+        sql = queries.captured_queries[0]['sql']
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('DISTINCT', sql)
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            steps = [step for *_, step in cursor.fetchall()]
+        self.assertIn('SEARCH Future_menuitem USING INDEX menuitem_weekday_window_idx', steps[0])
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        menu.invalidate()
+        today = Day.objects.create(name=timezone.localtime().strftime('%A'))
+        self.item = MenuItem.objects.create(
+            name='Poha', description='', price=Decimal('25.00'), quantity=5,
+            start_time=dtime(0, 0), end_time=dtime(23, 59, 59),
+        )
+        self.item.available_days.add(today)
+        self.employee = Employee.objects.create(
+            name='Ravi', email='ravi@example.com', department='IT', pin='1234', wallet_amount=Decimal('100.00')
+        )
+        session = self.client.session
+        session['employee_id'] = self.employee.id
+        session.save()
+
+    def revalidate(self, url):
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        return etag
+
+    def test_menu_change_invalidates_home(self):
+        etag = self.revalidate('/home')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.price = Decimal('30.00')
+            self.item.save()
+        response = self.client.get('/home', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '30.00')
+
+    def test_orders_only_invalidate_the_menu_when_an_item_sells_out(self):
+        MenuItem.objects.filter(pk=self.item.pk).update(quantity=4)
+        [(before, _)] = versions.get_versions('menu')
+        with self.captureOnCommitCallbacks(execute=True):
+            checkout.place_order(self.employee, [(self.item, 1)])
+        self.assertEqual(versions.get_versions('menu')[0][0], before)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            checkout.place_order(self.employee, [(self.item, 3)])
+        self.assertNotEqual(versions.get_versions('menu')[0][0], before)
+
+    def test_new_order_invalidates_history(self):
+        etag = self.revalidate('/order_history/')
+        with self.captureOnCommitCallbacks(execute=True):
+            checkout.place_order(self.employee, [(self.item, 1)])
+        response = self.client.get('/order_history/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_pending_messages_skip_validators(self):
+        self.client.post(f'/add-to-cart/{self.item.id}/', {'quantity': 1})
+        self.assertNotIn('ETag', self.client.get('/home'))
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class OrderHistoryPagingTests(TestCase):
+    def setUp(self):
+        employee = Employee.objects.create(
+            name='Lata', email='lata@example.com', department='IT', pin='1', wallet_amount=Decimal('100.00')
+        )
+        item = MenuItem.objects.create(name='Vada', description='', price=Decimal('10.00'), quantity=10)
+        self.orders = [checkout.place_order(employee, [(item, 1)]) for _ in range(3)]
+        # The two newest share a timestamp, so only the id tells them apart.
+        now = timezone.now()
+        Order.objects.filter(pk=self.orders[0].pk).update(created_at=now - timedelta(minutes=5))
+        Order.objects.filter(pk__in=[self.orders[1].pk, self.orders[2].pk]).update(created_at=now)
+        session = self.client.session
+        session['employee_id'] = employee.id
+        session.save()
+
+    def test_pages_walk_every_order_once_across_equal_timestamps(self):
+        with mock.patch('Future.views.ORDER_HISTORY_PAGE_SIZE', 1):
+            response = self.client.get('/order_history/')
+            seen = [order.daily_order_number for order in response.context['orders']]
+            cursor = response.context['next_cursor']
+            while cursor:
+                page = self.client.get('/order_history/more/', {'cursor': cursor}).json()
+                seen += [order['daily_order_number'] for order in page['orders']]
+                cursor = page['next_cursor']
+
+        self.assertEqual(seen, [order.daily_order_number for order in reversed(self.orders)])
+
+    def test_last_page_has_no_cursor(self):
+        with mock.patch('Future.views.ORDER_HISTORY_PAGE_SIZE', 3):
+            response = self.client.get('/order_history/')
+        self.assertEqual(len(response.context['orders']), 3)
+        self.assertIsNone(response.context['next_cursor'])
+
+    def test_tampered_cursors_are_rejected(self):
+        stamp = timezone.now().isoformat()
+        for cursor in ('', 'garbage', f'{stamp}|abc', f'{stamp}|{10 ** 30}', f'{stamp}|-1', '2025-01-01T10:00:00|5'):
+            response = self.client.get('/order_history/more/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class JsonApiTests(TestCase):
+    def setUp(self):
+        self.employee = Employee.objects.create(
+            name='Noor', email='noor@example.com', department='Ops', pin='1', wallet_amount=Decimal('50.00')
+        )
+        self.dosa = MenuItem.objects.create(name='Dosa', description='', price=Decimal('30.00'), quantity=2)
+        self.tea = MenuItem.objects.create(name='Tea', description='', price=Decimal('10.00'), quantity=10)
+
+    def post_json(self, url, body):
+        return self.client.post(url, body, content_type='application/json')
+
+    def sign_in(self):
+        session = self.client.session
+        session['employee_id'] = self.employee.id
+        session.save()
+
+    def test_cart_add_and_remove(self):
+        self.post_json(f'/api/cart/add/{self.tea.id}/', {'quantity': 2})
+        response = self.post_json(f'/api/cart/add/{self.dosa.id}/', {})
+        self.assertEqual(response.json(), {
+            'items': [
+                {'id': self.tea.id, 'name': 'Tea', 'quantity': 2, 'amount': '20.00'},
+                {'id': self.dosa.id, 'name': 'Dosa', 'quantity': 1, 'amount': '30.00'},
+            ],
+            'total': '50.00',
+        })
+
+        response = self.client.post(f'/api/cart/remove/{self.tea.id}/')
+        self.assertEqual([line['name'] for line in response.json()['items']], ['Dosa'])
+
+    def test_bad_bodies_are_rejected(self):
+        self.sign_in()
+        for url in (f'/api/cart/add/{self.tea.id}/', '/api/orders/'):
+            for body in ('{not json', '[1, 2]'):
+                self.assertEqual(self.post_json(url, body).status_code, 400, (url, body))
+        self.assertEqual(self.post_json(f'/api/cart/add/{self.tea.id}/', {'quantity': 'lots'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/cart/').json()['items'], [])
+
+    def test_place_order_needs_an_employee(self):
+        self.post_json(f'/api/cart/add/{self.tea.id}/', {})
+        response = self.post_json('/api/orders/', {})
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(Order.objects.exists())
+
+    def test_place_order(self):
+        self.sign_in()
+        self.assertEqual(self.post_json('/api/orders/', {}).status_code, 400)
+        self.post_json(f'/api/cart/add/{self.tea.id}/', {'quantity': 2})
+        self.assertEqual(self.post_json('/api/orders/', {'pickup_slot': 'soon'}).status_code, 400)
+
+        response = self.post_json('/api/orders/', {})
+
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body['total_amount'], body['wallet_amount'], body['pickup_slot']), ('20.00', '30.00', None))
+        self.assertEqual(Order.objects.get().id, body['order_id'])
+        self.assertEqual(self.client.get('/api/cart/').json()['items'], [])
+
+    def test_place_order_conflicts(self):
+        self.sign_in()
+        self.post_json(f'/api/cart/add/{self.dosa.id}/', {'quantity': 3})
+        response = self.post_json('/api/orders/', {})
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('error', response.json())
+
+        self.client.post(f'/api/cart/remove/{self.dosa.id}/')
+        self.post_json(f'/api/cart/add/{self.tea.id}/', {'quantity': 6})
+        response = self.post_json('/api/orders/', {})
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('balance', response.json()['error'])
+        self.assertFalse(Order.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class AsyncReadPathTests(TestCase):
+    def setUp(self):
+        menu.invalidate()
+        profiling.store.clear()
+        today = Day.objects.create(name=timezone.localtime().strftime('%A'))
+        self.item = MenuItem.objects.create(
+            name='Upma', description='', price=Decimal('20.00'), quantity=5,
+            start_time=dtime(0, 0), end_time=dtime(23, 59, 59),
+        )
+        self.item.available_days.add(today)
+        self.employee = Employee.objects.create(
+            name='Asha', email='asha@example.com', department='HR', pin='4321', wallet_amount=Decimal('100.00')
+        )
+        self.order = checkout.place_order(self.employee, [(self.item, 2)])
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session['employee_id'] = self.employee.id
+        session.save()
+        self.async_client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    async def test_read_paths(self):
+        response = await self.async_client.get('/api/wallet/')
+        self.assertEqual(response.json()['wallet_amount'], '60.00')
+
+        response = await self.async_client.get('/api/menu/')
+        self.assertEqual([item['name'] for item in response.json()['items']], ['Upma'])
+
+        response = await self.async_client.get(f'/order_success/{self.order.id}/')
+        self.assertContains(response, 'Asha')
+
+        response = await self.async_client.get('/home')
+        self.assertEqual(response.context['employee'], self.employee)
+
+        response = await self.async_client.get('/order_history/')
+        self.assertContains(response, 'Upma')
+        response = await self.async_client.get('/order_history/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_profiler_sees_async_queries(self):
+        await self.async_client.get('/api/wallet/')
+        rows = {row['view']: row for row in profiling.store.summary()}
+        self.assertGreater(rows['api_wallet']['queries_max'], 0)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class KitchenFeedTests(TestCase):
+    def setUp(self):
+        kitchen.feed.clear()
+        self.item = MenuItem.objects.create(
+            name='Idli', description='', price=Decimal('15.00'), quantity=50,
+            start_time=dtime(0, 0), end_time=dtime(23, 59, 59),
+        )
+        self.employee = Employee.objects.create(
+            name='Kiran', email='kiran@example.com', department='Ops', pin='1111', wallet_amount=Decimal('500.00')
+        )
+        # Placed before any screen connects, so only the database has it.
+        self.first = checkout.place_order(self.employee, [(self.item, 1)])
+        self.staff = User.objects.create_superuser('chef', 'chef@example.com', 'pw')
+
+    def place_order(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return checkout.place_order(self.employee, [(self.item, 3)])
+
+    async def next_event(self, chunks):
+        while True:
+            chunk = (await asyncio.wait_for(anext(chunks), 5)).decode()
+            if chunk.startswith('id:'):
+                return json.loads(chunk.split('data: ', 1)[1])
+
+    def test_feed_is_staff_only(self):
+        self.assertEqual(self.client.get('/kitchen/feed/').status_code, 302)
+
+    @override_settings(CANTEEN_ASGI=True)
+    async def test_catch_up_then_live_orders(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get('/kitchen/feed/', {'since': 0})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+
+        event = await self.next_event(chunks)
+        self.assertEqual(event['id'], self.first.id)
+
+        second = await sync_to_async(self.place_order)()
+        event = await self.next_event(chunks)
+        self.assertEqual(event['daily_order_number'], second.daily_order_number)
+        self.assertEqual(event['items'], [{'name': 'Idli', 'quantity': 3}])
+        await chunks.aclose()
+
+    def test_wsgi_feed_polls_then_ends(self):
+        self.client.force_login(self.staff)
+        with mock.patch.object(kitchen, 'KITCHEN_FEED_WSGI_SECONDS', 0):
+            response = self.client.get('/kitchen/feed/', {'since': 0})
+            self.assertFalse(response.is_async)
+            body = b''.join(response.streaming_content).decode()
+        self.assertIn(f"id: {self.first.id}\n", body)
+
+    def test_admin_opens_the_feed_only_under_asgi(self):
+        self.client.force_login(self.staff)
+        url = f'/admin/Future/order/view-orders/{timezone.localdate()}/'
+        self.assertIsNone(self.client.get(url).context['live_feed_url'])
+        with override_settings(CANTEEN_ASGI=True):
+            self.assertIn('since=', self.client.get(url).context['live_feed_url'])
+
+    def test_buffer_reports_evicted_cursors(self):
+        feed = kitchen.OrderFeed(size=2)
+        for order_id in (1, 2, 3):
+            feed.publish({'id': order_id})
+        self.assertEqual([event['id'] for event in feed.after(1)], [2, 3])
+        self.assertIsNone(feed.after(0))
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class PhotoDerivativeTests(TestCase):
+    def setUp(self):
+        buffer = BytesIO()
+        Image.new('RGB', (2400, 1800), (200, 120, 40)).save(buffer, 'JPEG', quality=95)
+        self.item = MenuItem.objects.create(name='Vada', description='', price=Decimal('15.00'), quantity=3)
+        self.item.photo.save('vada.jpg', ContentFile(buffer.getvalue()))
+
+    def test_derivatives_are_resized_and_served_immutable(self):
+        self.assertTrue(images.generate(MenuItem, self.item.pk))
+        self.item.refresh_from_db()
+        self.assertFalse(images.needs_derivatives(self.item))
+
+        for size, (width, height) in images.IMAGE_SIZES.items():
+            for name in self.item.photo_variants[size].values():
+                with default_storage.open(name) as f:
+                    self.assertEqual(Image.open(f).size, (width, height))
+
+        html = images.picture_html(self.item, 'card', alt='Vada')
+        self.assertIn('type="image/webp"', html)
+        self.assertNotIn(self.item.photo.url, html)
+
+        response = self.client.get(images.variant_urls(self.item)['thumb']['webp'])
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_original_is_used_until_derivatives_exist(self):
+        self.assertIn(self.item.photo.url, images.picture_html(self.item, 'thumb'))
+
+
+class CartItemAdminQueryTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        self.employees = seed_employees(5)
+        self.menu_items = seed_menu_items(6)
+
+    def render_day(self, day, orders):
+        seed_orders(day, orders, self.employees, self.menu_items)
+        url = f"/admin/Future/cartitem/view-cartitems/{day.isoformat()}/"
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_query_count_is_flat_in_order_volume(self):
+        _, small = self.render_day(date(2025, 3, 1), 3)
+        _, large = self.render_day(date(2025, 3, 2), 40)
+        self.assertEqual(small, large)
+
+    def test_order_totals_come_from_the_aggregate(self):
+        response, _ = self.render_day(date(2025, 3, 3), 4)
+        for item in response.context['cart_items']:
+            expected = sum(ci.menu_item.price * ci.quantity for ci in item.order.cartitem_set.all())
+            self.assertEqual(item.total_order_price_value, expected)
+
+    def test_changelist_total_keeps_two_decimal_places(self):
+        employee = self.employees[0]
+        item = MenuItem.objects.create(name='Thali', description='', price=Decimal('70'), quantity=5)
+        order = checkout.place_order(employee, [(item, 1)])
+        model_admin = admin.site._registry[CartItem]
+
+        row = model_admin.get_queryset(RequestFactory().get('/')).get(order=order)
+
+        self.assertEqual(str(model_admin.total_order_price(row)), '70.00')
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class QueryPlanTests(TestCase):
+    """Every query the hot paths run must reach orders and line items through an index."""
+
+    HOT_TABLES = ('Future_order', 'Future_cartitem')
+
+    def setUp(self):
+        self.day = date(2025, 3, 4)
+        self.employees = seed_employees(4)
+        seed_orders(self.day, 30, self.employees, seed_menu_items(5))
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        session = self.client.session
+        session['employee_id'] = self.employees[0].id
+        session.save()
+
+    def assertIndexedPlans(self, run):
+        with CaptureQueriesContext(connection) as ctx:
+            run()
+
+        selects = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertTrue(any(table in sql for sql in selects for table in self.HOT_TABLES))
+        with connection.cursor() as cursor:
+            for sql in selects:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                for *_, step in cursor.fetchall():
+                    for table in self.HOT_TABLES:
+                        self.assertFalse(step.startswith(f"SCAN {table}"), f"{step}\n{sql}")
+                    if 'Future_order' in sql and 'ORDER BY' in sql:
+                        self.assertNotIn('TEMP B-TREE FOR ORDER BY', step, sql)
+
+    def test_order_history(self):
+        self.assertIndexedPlans(lambda: self.client.get('/order_history/'))
+        cursor = f"{timezone.now().isoformat()}|{10 ** 6}"
+        self.assertIndexedPlans(lambda: self.client.get('/order_history/more/', {'cursor': cursor}))
+
+    def test_daily_report(self):
+        self.assertIndexedPlans(lambda: reports.report_rows(reports.daily_orders(self.day)))
+
+    def test_admin_day_views(self):
+        self.assertIndexedPlans(lambda: self.client.get(f"/admin/Future/order/view-orders/{self.day}/"))
+        self.assertIndexedPlans(lambda: self.client.get(f"/admin/Future/cartitem/view-cartitems/{self.day}/"))
+
+    def test_rollup_rebuild(self):
+        self.assertIndexedPlans(lambda: rollups.rebuild(self.day))
+
+
+class SqliteProfileTests(TestCase):
+    def pragmas(self, profile):
+        with override_settings(SQLITE_PRAGMAS=settings.SQLITE_PROFILES[profile]['PRAGMAS']):
+            fresh = connections.create_connection('default')
+            try:
+                with fresh.cursor() as cursor:
+                    return {
+                        name: cursor.execute(f"PRAGMA {name}").fetchone()[0]
+                        for name in ('synchronous', 'busy_timeout', 'cache_size', 'temp_store')
+                    }
+            finally:
+                fresh.close()
+
+    def test_each_profile_applies_its_pragmas(self):
+        # journal_mode is left out: the in-memory test database can't switch to WAL.
+        self.assertEqual(self.pragmas('production'), {
+            'synchronous': 1, 'busy_timeout': 10000, 'cache_size': -32000, 'temp_store': 2,
+        })
+        # Stock keeps SQLite's defaults; busy_timeout is the sqlite3 module's own 5 seconds.
+        stock = self.pragmas('stock')
+        self.assertEqual((stock['synchronous'], stock['busy_timeout'], stock['temp_store']), (2, 5000, 0))
+
+    def test_stock_is_the_default_profile(self):
+        self.assertEqual(settings.SQLITE_PRAGMAS, settings.SQLITE_PROFILES['stock']['PRAGMAS'])
+
+
+class QueryProfilerTests(TestCase):
+    def setUp(self):
+        profiling.store.clear()
+        self.items = seed_menu_items(6)
+
+    def test_repeated_shapes_are_flagged(self):
+        profile = profiling.RequestProfile()
+        with connection.execute_wrapper(profile):
+            for item in self.items:
+                MenuItem.objects.get(pk=item.pk)
+            list(MenuItem.objects.filter(pk__in=[item.pk for item in self.items]))
+
+        self.assertEqual(profile.count, 7)
+        [(shape, count)] = profile.repeated(threshold=5).items()
+        self.assertEqual(count, 6)
+        self.assertIn('WHERE "Future_menuitem"."id" = %s', shape)
+
+    def test_fingerprint_collapses_literals_and_in_lists(self):
+        self.assertEqual(
+            profiling.fingerprint("SELECT * FROM t WHERE a = 12 AND b IN (%s, %s, %s) AND c = 'x''y'"),
+            "SELECT * FROM t WHERE a = ? AND b IN (...) AND c = ?",
+        )
+
+    def test_summary_page_is_staff_only(self):
+        self.client.get('/home')
+        url = '/admin/query-profile/'
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        response = self.client.get(url)
+        rows = {row['view']: row for row in response.context['rows']}
+        self.assertEqual(rows['home']['requests'], 1)
+        self.assertContains(response, 'home')
+
+
+class MetricsTests(TestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = metrics.Histogram('test_seconds', "Test.", ['view'], buckets=(0.1, 1.0))
+        self.addCleanup(metrics.REGISTRY.remove, histogram)
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.observe(value, 'home')
+
+        text = metrics.render()
+        self.assertIn('test_seconds_bucket{view="home",le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{view="home",le="1.0"} 3', text)
+        self.assertIn('test_seconds_bucket{view="home",le="+Inf"} 4', text)
+        self.assertIn('test_seconds_count{view="home"} 4', text)
+
+    def test_endpoint_is_local_only(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        self.assertContains(response, '# TYPE canteen_checkout_seconds histogram')
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code, 404)
+
+    def test_observation_overhead_is_microseconds(self):
+        histogram = metrics.Histogram('overhead_seconds', "Test.", ['view'])
+        self.addCleanup(metrics.REGISTRY.remove, histogram)
+        rounds = 50_000
+        started = time.perf_counter()
+        for _ in range(rounds):
+            histogram.observe(0.01, 'home')
+        per_observation = (time.perf_counter() - started) / rounds
+        self.assertLess(per_observation, 5e-6)
+
+
+class LunchRushFlowTests(TestCase):
+    def test_flow_places_an_order(self):
+        menu.invalidate()
+        seed_menu(items_per_window=2)
+        [employee] = seed_employees(1)
+        item_ids = [item.id for item in menu.current_menu_items()][:2]
+
+        for step, method, url, data in lunch_rush_flow(employee.id, employee.pin, item_ids):
+            response = getattr(self.client, method)(url, data)
+            self.assertLess(response.status_code, 400, step)
+
+        order = Order.objects.get(employee=employee)
+        self.assertEqual(set(order.cartitem_set.values_list('menu_item', flat=True)), set(item_ids))
+
+
+class FlakyBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError("SMTP went away")
+
+
+class UnreachableBackend(EmailBackend):
+    def open(self):
+        raise ConnectionRefusedError("SMTP is down")
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class OutboxTests(TestCase):
+    def setUp(self):
+        employee = Employee.objects.create(
+            name='Ravi', email='ravi@example.com', department='HR', pin='1111', wallet_amount=Decimal('50.00')
+        )
+        item = MenuItem.objects.create(name='Pongal', description='', price=Decimal('25.00'), quantity=10)
+        self.order = checkout.place_order(employee, [(item, 2)])
+
+    def test_order_queues_email_without_sending(self):
+        message = OutboxEmail.objects.get(order=self.order)
+        self.assertEqual(message.status, OutboxEmail.PENDING)
+        self.assertIn('Pongal', message.html_body)
+        self.assertEqual(mail.outbox, [])
+
+    def test_drain_sends_pending_emails(self):
+        self.assertEqual(drain_outbox(), (1, 0))
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['ravi@example.com'])
+        self.assertEqual(OutboxEmail.objects.get().status, OutboxEmail.SENT)
+        self.assertEqual(drain_outbox(), (0, 0))
+
+    def test_failed_send_backs_off(self):
+        self.assertEqual(drain_outbox(connection=FlakyBackend()), (0, 1))
+
+        message = OutboxEmail.objects.get()
+        self.assertEqual((message.status, message.attempts), (OutboxEmail.PENDING, 1))
+        self.assertGreater(message.next_attempt_at, timezone.now())
+        self.assertEqual(drain_outbox(), (0, 0))
+
+    def test_connect_failure_backs_off_the_whole_batch(self):
+        self.assertEqual(drain_outbox(connection=UnreachableBackend()), (0, 1))
+
+        message = OutboxEmail.objects.get()
+        self.assertEqual((message.status, message.attempts), (OutboxEmail.PENDING, 1))
+        self.assertIn('SMTP is down', message.last_error)
+        self.assertGreater(message.next_attempt_at, timezone.now())
+
+    def test_claimed_emails_are_not_handed_to_a_second_worker(self):
+        claimed = outbox.claim_batch(10)
+
+        self.assertEqual([message.order_id for message in claimed], [self.order.id])
+        self.assertEqual(outbox.claim_batch(10), [])
+        self.assertEqual(drain_outbox(), (0, 0))
+        self.assertEqual(mail.outbox, [])
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class ConcurrentCheckoutStressTest(TransactionTestCase):
+    workers = 8
+    attempts_per_worker = 25
+    stock = 60
+
+    def run(self, result=None):
+        # Throughput is only worth reporting when the runner lists tests one by one (-v 2).
+        self.verbose = getattr(result, 'showAll', False)
+        return super().run(result)
+
+    def test_concurrent_checkouts_never_oversell(self):
+        item = MenuItem.objects.create(name='Biryani', description='', price=Decimal('50.00'), quantity=self.stock)
+        employees = [
+            Employee.objects.create(
+                name=f'Worker {n}', email=f'worker{n}@example.com', department='Ops', pin='0000',
+                wallet_amount=Decimal('50.00') * self.attempts_per_worker,
+            )
+            for n in range(self.workers)
+        ]
+        results = {'placed': 0, 'rejected': 0}
+        lock = threading.Lock()
+
+        def worker(employee):
+            try:
+                for _ in range(self.attempts_per_worker):
+                    while True:
+                        try:
+                            lines, _ = checkout.resolve_cart({str(item.id): 1})
+                            checkout.place_order(employee, lines)
+                            outcome = 'placed'
+                        except checkout.OutOfStock:
+                            outcome = 'rejected'
+                        except OperationalError:
+                            # SQLite refuses a second writer instead of queueing it.
+                            time.sleep(0.001)
+                            continue
+                        break
+                    with lock:
+                        results[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(employee,)) for employee in employees]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        item.refresh_from_db()
+        sold = sum(CartItem.objects.filter(menu_item=item).values_list('quantity', flat=True))
+        spent = sum(Decimal('50.00') * self.attempts_per_worker - e.wallet_amount for e in Employee.objects.all())
+
+        self.assertEqual(results['placed'], self.stock)
+        self.assertEqual(results['rejected'], self.workers * self.attempts_per_worker - self.stock)
+        self.assertEqual(item.quantity, 0)
+        self.assertEqual(sold, self.stock)
+        self.assertEqual(Order.objects.count(), self.stock)
+        self.assertEqual(
+            sorted(Order.objects.values_list('daily_order_number', flat=True)), list(range(1, self.stock + 1))
+        )
+        self.assertEqual(spent, item.price * self.stock)
+
+        if self.verbose:
+            sys.stderr.write(
+                f"\n{results['placed']} orders from {self.workers} concurrent workers "
+                f"in {elapsed:.2f}s ({results['placed'] / elapsed:.1f} orders/s) "
+            )
@@ -0,0 +1,91 @@
+import uuid
+import hashlib
+from functools import wraps
+from django.conf import settings
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+from django.core.cache import caches
+from django.middleware.csrf import get_token
+from django.views.decorators.http import condition
+from django.contrib.messages.storage.cookie import CookieStorage
+
+VERSION_CACHE_ALIAS = getattr(settings, 'VERSION_CACHE_ALIAS', 'versions')
+
+
+def _new_stamp():
+    return uuid.uuid4().hex[:12], timezone.now().replace(microsecond=0)
+
+
+def get_versions(*keys):
+    """Return a ``(token, last_modified)`` stamp per key, creating missing ones."""
+    cache = caches[VERSION_CACHE_ALIAS]
+    names = [f"version:{key}" for key in keys]
+    stamps = cache.get_many(names)
+    for name in names:
+        if name not in stamps:
+            # A lost stamp just means one full render for every client.
+            cache.add(name, _new_stamp(), None)
+            stamps[name] = cache.get(name) or _new_stamp()
+    return [stamps[name] for name in names]
+
+
+def bump(*keys):
+    caches[VERSION_CACHE_ALIAS].set_many({f"version:{key}": _new_stamp() for key in keys}, None)
+
+
+def page_stamp(request, keys, extra=(), since=None):
+    """
+    ETag and Last-Modified for a page built only from the versioned ``keys``.
+
+    ``extra`` holds anything else the page varies on and ``since`` is a time
+    the page changes at without any key being bumped (a menu slot opening).
+    Returns ``(None, None)`` while flash messages are pending, because
+    those have to be rendered into a fresh page.
+    """
+    if hasattr(request, '_page_stamp'):
+        return request._page_stamp
+
+    if request.COOKIES.get(CookieStorage.cookie_name):
+        request._page_stamp = (None, None)
+        return request._page_stamp
+
+    stamps = get_versions(*keys)
+    modified = [stamp for _, stamp in stamps] + ([since] if since else [])
+    parts = [token for token, _ in stamps] + [str(value) for value in extra] + [str(since)]
+    # Pages embed CSRF tokens, so they also vary on the CSRF secret. get_token()
+    # issues one now if needed, letting the first response already validate.
+    get_token(request)
+    parts.append(request.META.get('CSRF_COOKIE', ''))
+    etag = hashlib.md5("|".join(parts).encode()).hexdigest()
+    request._page_stamp = (etag, max(modified))
+    return request._page_stamp
+
+
+def conditional_page(stamp_func):
+    """``condition()`` kwargs for a view whose stamp is ``stamp_func(request, *args, **kwargs)``."""
+    return {
+        'etag_func': lambda request, *args, **kwargs: stamp_func(request, *args, **kwargs)[0],
+        'last_modified_func': lambda request, *args, **kwargs: stamp_func(request, *args, **kwargs)[1],
+    }
+
+
+def async_conditional_page(stamp_func):
+    """
+    ``condition()`` for an async view whose stamp is ``stamp_func(request, *args, **kwargs)``.
+
+    Stamps read the session (possibly from the database) and the version
+    cache, so they are computed in a worker thread rather than on the
+    event loop, and condition() is handed the result.
+    """
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=lambda request, *args, **kwargs: request._view_stamp[0],
+            last_modified_func=lambda request, *args, **kwargs: request._view_stamp[1],
+        )(view)
+
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            request._view_stamp = await sync_to_async(stamp_func)(request, *args, **kwargs)
+            return await conditional_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
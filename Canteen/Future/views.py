@@ -1,50 +1,55 @@
 from datetime import datetime
+from django.conf import settings
 from django.utils import timezone
-from django.db import transaction
-from django.contrib import messages
-from django.http import HttpResponse
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.views.decorators.http import require_POST
-from django.shortcuts import render, redirect, get_object_or_404
-
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-
+from django.contrib import admin, messages
+from django.db.models import Prefetch, Q
+from django.utils.formats import date_format
+from django.utils.cache import patch_cache_control
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse, FileResponse, JsonResponse, StreamingHttpResponse
+from django.core.files.storage import default_storage
+from django.views.decorators.http import require_GET, require_POST
+from django.contrib.admin.views.decorators import staff_member_required
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+
+from . import menu, slots, images, archive, kitchen, metrics, reports, rollups, checkout, versions, profiling
+from .cart import Cart
 from .forms import OrderForm
-from .models import MenuItem, Order, Employee, CartItem
+from .models import Order, Employee, CartItem
+
+ORDER_HISTORY_PAGE_SIZE = getattr(settings, 'ORDER_HISTORY_PAGE_SIZE', 20)
+PHOTO_CACHE_SECONDS = getattr(settings, 'PHOTO_CACHE_SECONDS', 60 * 60 * 24 * 365)
+METRICS_ALLOWED_IPS = getattr(settings, 'METRICS_ALLOWED_IPS', ('127.0.0.1', '::1'))
 
 
 def qr_scanner(request):
     return render(request, "qr_scanner.html")
 
 
-def order_success(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
+async def order_success(request, order_id):
+    order = await aget_object_or_404(Order.objects.select_related('employee', 'pickup_slot'), id=order_id)
     return render(request, 'order_success.html', {'order': order})
 
 
-def home(request):
-    now_time = timezone.localtime().time()
-    today = timezone.localdate().strftime('%A')
+def _home_stamp(request):
+    keys = ['menu']
+    employee_id = request.session.get('employee_id')
+    if employee_id:
+        keys.append(f"employee:{employee_id}")
+    return versions.page_stamp(request, keys, since=menu.current_slot_started())
 
-    available_items = MenuItem.objects.filter(
-        available_days__name=today,
-        start_time__lte=now_time,
-        end_time__gte=now_time,
-    ).distinct()
 
+@metrics.timed(metrics.VIEW_SECONDS, 'home')
+@versions.async_conditional_page(_home_stamp)
+async def home(request):
+    # The menu comes from the in-process cache and only queries on a miss.
+    available_items = await sync_to_async(menu.current_menu_items)()
     form = OrderForm(menu_items=available_items)
 
     employee = None
-    employee_id = request.session.get('employee_id')
+    employee_id = await request.session.aget('employee_id')
     if employee_id:
-        try:
-            employee = Employee.objects.get(id=employee_id)
-        except Employee.DoesNotExist:
-            employee = None
+        employee = await Employee.objects.filter(id=employee_id).afirst()
 
     return render(request, 'home.html', {
         'menu_items': available_items,
@@ -53,17 +58,10 @@ def home(request):
     })
 
 
-def get_daily_order_number():
-    today = timezone.now().date()
-    last_order = Order.objects.filter(created_at__date=today).order_by('-daily_order_number').first()
-    if last_order:
-        return last_order.daily_order_number + 1
-    return 1
-
-
 @require_POST
+@metrics.timed(metrics.VIEW_SECONDS, 'place_order')
 def place_order(request):
-    cart = request.session.get('cart', {})
+    cart = Cart(request)
     if not cart:
         messages.error(request, "Your cart is empty.")
         return redirect('home')
@@ -73,81 +71,141 @@ def place_order(request):
         messages.error(request, "Employee not recognized. Please scan QR again.")
         return redirect('home')
 
+    try:
+        pickup_slot = int(request.POST['pickup_slot']) if request.POST.get('pickup_slot') else None
+    except ValueError:
+        messages.error(request, "Please choose a valid pickup slot.")
+        return redirect('cart')
+
     employee = get_object_or_404(Employee, id=employee_id)
-    total = 0
-    items_to_order = []
+    items_to_order, missing_ids = cart.resolve()
 
-    for item_id, qty in cart.items():
-        item = MenuItem.objects.filter(id=item_id).first()
-        if not item:
-            messages.warning(request, f"Item with ID {item_id} is no longer available and was removed from your cart.")
-            continue
+    for item_id in missing_ids:
+        messages.warning(request, f"Item with ID {item_id} is no longer available and was removed from your cart.")
 
+    for item, qty in items_to_order:
         if item.quantity < qty:
+            metrics.CHECKOUT_REJECTIONS.inc('out_of_stock')
             messages.error(request, f"Not enough quantity for {item.name}. Only {item.quantity} left.")
             return redirect('cart')
 
-        total += item.price * qty
-        items_to_order.append((item, qty))
-
     if not items_to_order:
         messages.error(request, "No valid items in your cart.")
-        request.session['cart'] = {}
+        cart.clear()
         return redirect('home')
 
+    total = checkout.cart_total(items_to_order)
     if employee.wallet_amount < total:
+        metrics.CHECKOUT_REJECTIONS.inc('insufficient_balance')
         messages.error(request, f"Insufficient balance! You need ₹{total}, but have only ₹{employee.wallet_amount}.")
         return redirect('cart')
 
-    with transaction.atomic():
-        daily_order_num = get_daily_order_number()
-        order = Order.objects.create(employee=employee, total_amount=0, daily_order_number=daily_order_num)
+    try:
+        order = checkout.place_order(employee, items_to_order, pickup_slot=pickup_slot)
+    except checkout.CheckoutError as e:
+        messages.error(request, str(e))
+        return redirect('cart')
 
-        for item, qty in items_to_order:
-            item.quantity -= qty
-            item.save()
+    cart.clear()
+    messages.success(request, f"Order placed successfully! Remaining Balance: ₹{employee.wallet_amount}")
+    return redirect('order_success', order.id)
 
-            CartItem.objects.create(
-                employee=employee,
-                menu_item=item,
-                quantity=qty,
-                order=order
-            )
 
-        employee.wallet_amount -= total
-        employee.save()
+async def _order_history_page(employee_id, cursor=None):
+    orders = (
+        Order.objects
+        .filter(employee_id=employee_id)
+        .prefetch_related(Prefetch('cartitem_set', queryset=CartItem.objects.select_related('menu_item').order_by('id')))
+        .order_by('-created_at', '-id')
+    )
+    if cursor:
+        created_at, order_id = cursor
+        orders = orders.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=order_id))
 
-        order.total_amount = total
-        order.save()
+    page = [order async for order in orders[:ORDER_HISTORY_PAGE_SIZE + 1]]
+    next_cursor = None
+    if len(page) > ORDER_HISTORY_PAGE_SIZE:
+        page = page[:ORDER_HISTORY_PAGE_SIZE]
+        last = page[-1]
+        next_cursor = f"{last.created_at.isoformat()}|{last.id}"
+    return page, next_cursor
 
-    send_order_email(employee, order)
 
-    request.session['cart'] = {}
-    messages.success(request, f"Order placed successfully! Remaining Balance: ₹{employee.wallet_amount}")
-    return redirect('order_success', order.id)
+def _parse_history_cursor(value):
+    try:
+        created_at, order_id = value.rsplit('|', 1)
+        created_at, order_id = datetime.fromisoformat(created_at), int(order_id)
+    except ValueError:
+        return None
+    # Anything we didn't hand out: ids that can't be a row id, or a timestamp without its offset.
+    if not 0 < order_id < 2 ** 63 or timezone.is_naive(created_at):
+        return None
+    return created_at, order_id
 
 
-def order_history(request):
+def _order_history_stamp(request):
     employee_id = request.session.get('employee_id')
+    if not employee_id:
+        return None, None
+    return versions.page_stamp(request, [f"employee:{employee_id}", 'orders'], extra=(request.GET.get('cursor'),))
+
+
+@versions.async_conditional_page(_order_history_stamp)
+async def order_history(request):
+    employee_id = await request.session.aget('employee_id')
     if not employee_id:
         messages.error(request, "Employee not found. Please scan your QR.")
         return redirect('home')
 
-    employee = get_object_or_404(Employee, id=employee_id)
-    orders = Order.objects.filter(employee=employee).order_by('-created_at')
-    return render(request, 'order_history.html', {'orders': orders})
+    orders, next_cursor = await _order_history_page(employee_id)
+    return render(request, 'order_history.html', {'orders': orders, 'next_cursor': next_cursor})
 
 
+@versions.async_conditional_page(_order_history_stamp)
+async def order_history_more(request):
+    employee_id = await request.session.aget('employee_id')
+    if not employee_id:
+        return JsonResponse({'error': "Employee not found. Please scan your QR."}, status=403)
+
+    cursor = _parse_history_cursor(request.GET.get('cursor', ''))
+    if cursor is None:
+        return JsonResponse({'error': "Invalid cursor."}, status=400)
+
+    orders, next_cursor = await _order_history_page(employee_id, cursor)
+    return JsonResponse({
+        'orders': [
+            {
+                'daily_order_number': order.daily_order_number,
+                'created_at': date_format(timezone.localtime(order.created_at), "d M Y, H:i"),
+                'total_amount': str(order.total_amount),
+                'items': [
+                    {
+                        'name': cart_item.menu_item.name,
+                        'quantity': cart_item.quantity,
+                        'amount': str(cart_item.total_price),
+                    }
+                    for cart_item in order.cartitem_set.all()
+                ],
+            }
+            for order in orders
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
+@metrics.timed(metrics.VIEW_SECONDS, 'verify_employee')
 def verify_employee(request, employee_id):
     employee = get_object_or_404(Employee, id=employee_id)
 
     if request.method == 'POST':
         entered_pin = request.POST.get('pin')
         if entered_pin and entered_pin.strip() == str(employee.pin):
+            metrics.EMPLOYEE_VERIFICATIONS.inc('ok')
             request.session['employee_id'] = employee.id
             messages.success(request, f"Welcome, {employee.name}!")
             return redirect('home')
         else:
+            metrics.EMPLOYEE_VERIFICATIONS.inc('bad_pin')
             messages.error(request, "Incorrect PIN.")
 
     return render(request, 'verify_employee.html', {'employee': employee})
@@ -155,51 +213,43 @@ def verify_employee(request, employee_id):
 
 @require_POST
 def add_to_cart(request, item_id):
-    cart = request.session.get('cart', {})
     quantity = int(request.POST.get('quantity', 1))
     if quantity <= 0:
         quantity = 1
 
-    item_id_str = str(item_id)
-    cart[item_id_str] = cart.get(item_id_str, 0) + quantity
-
-    request.session['cart'] = cart
+    Cart(request).add(item_id, quantity)
     messages.success(request, "Item added to cart.")
     return redirect('home')
 
 
 def remove_from_cart(request, item_id):
-    cart = request.session.get('cart', {})
-    cart.pop(str(item_id), None)
-    request.session['cart'] = cart
+    Cart(request).remove(item_id)
     messages.success(request, "Item removed from cart.")
     return redirect('cart')
 
 
 def cart_view(request):
-    cart = request.session.get('cart', {})
+    lines, _ = Cart(request).resolve()
     cart_items = []
     total = 0
 
-    for item_id, qty in cart.items():
-        try:
-            item = MenuItem.objects.get(id=item_id)
-            amount = item.price * qty
-            cart_items.append({
-                'item': item,
-                'quantity': qty,
-                'amount': amount
-            })
-            total += amount
-        except MenuItem.DoesNotExist:
-            continue
+    for item, qty in lines:
+        amount = item.price * qty
+        cart_items.append({
+            'item': item,
+            'quantity': qty,
+            'amount': amount
+        })
+        total += amount
 
     return render(request, 'cart.html', {
         'cart_items': cart_items,
-        'total': total
+        'total': total,
+        'pickup_slots': slots.open_slots() if cart_items else [],
     })
 
 
+@metrics.timed(metrics.VIEW_SECONDS, 'export_daily_report_pdf')
 def export_daily_report_pdf(request):
     date_str = request.GET.get('date')
     if not date_str:
@@ -210,79 +260,90 @@ def export_daily_report_pdf(request):
     except ValueError:
         return HttpResponse("Invalid date format.", status=400)
 
-    orders = Order.objects.filter(created_at__date=date)
-
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="daily_report_{date_str}.pdf"'
-
-    doc = SimpleDocTemplate(response, pagesize=A4)
-    elements = []
-    styles = getSampleStyleSheet()
-    elements.append(Paragraph(f"📝 Daily Report for {date.strftime('%d-%m-%Y')}", styles['Title']))
-    elements.append(Spacer(1, 12))
-
-    data = [['Employee', 'Items Ordered', 'Total Amount', 'Time']]
-    for order in orders:
-        items = ", ".join([f"{item.menu_item.name} × {item.quantity}" for item in order.cartitem_set.all()])
-        time = order.created_at.strftime('%I:%M %p')
-        data.append([order.employee.name, items, f"₹{order.total_amount}", time])
-
-    table = Table(data, hAlign='LEFT', colWidths=[120, 220, 80, 80])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
-
-    elements.append(table)
-    doc.build(elements)
-
-    return response
-
-
-def send_order_email(employee, order):
-    subject = f"Order Confirmation - Order #{order.daily_order_number} - {order.created_at.strftime('%Y-%m-%d')}"
-    recipient = employee.email
-
-    cart_items = CartItem.objects.filter(order=order)
-    context = {
-        'user': employee,
-        'order': order,
-        'cart_items': cart_items,
-    }
-    message = render_to_string('email/order_email.html', context)
-
-    send_mail(
-        subject,
-        '',
-        None,  # or your settings.DEFAULT_FROM_EMAIL if configured
-        [recipient],
-        html_message=message,
-        fail_silently=False
+    path = reports.daily_report_path(date)
+    return FileResponse(
+        default_storage.open(path, 'rb'),
+        as_attachment=True,
+        filename=f"daily_report_{date_str}.pdf",
+        content_type='application/pdf',
     )
 
 
+@staff_member_required
 def delete_orders_by_date(request):
     if request.method == "POST":
         date_str = request.POST.get("date")  
         
         if not date_str:
             messages.error(request, "No date provided.")
-            return redirect('admin:order_change_list')
+            return redirect('admin:Future_order_changelist')
 
         try:
             
             date = timezone.datetime.strptime(date_str, "%Y-%m-%d").date()
         except ValueError:
             messages.error(request, "Invalid date format.")
-            return redirect('admin:order_change_list')
+            return redirect('admin:Future_order_changelist')
 
-        deleted_count, _ = Order.objects.filter(created_at__date=date).delete()
+        order_ids = Order.objects.filter(order_date=date).values_list('id', flat=True).order_by('id')
+        deleted_count = archive.purge_orders(order_ids)
+        rollups.rebuild(date)
+        slots.recount(date)
         messages.success(request, f"{deleted_count} orders from {date.strftime('%d-%m-%Y')} deleted successfully.")
-        return redirect('admin:order_change_list')
+        return redirect('admin:Future_order_changelist')
+
+    return redirect('admin:Future_order_changelist')
+
+
+@require_GET
+def photo_derivative(request, name):
+    # Derivative names are content hashes, so a URL never changes content.
+    path = f"{images.DERIVATIVE_DIR}/{name}"
+    if not default_storage.exists(path):
+        raise Http404("Photo not found.")
 
-    return redirect('admin:order_change_list')
\ No newline at end of file
+    response = FileResponse(default_storage.open(path, 'rb'))
+    patch_cache_control(response, public=True, max_age=PHOTO_CACHE_SECONDS, immutable=True)
+    return response
+
+
+def query_profile(request):
+    if request.method == 'POST':
+        profiling.store.clear()
+        messages.success(request, "Query profile cleared.")
+        return redirect('admin_query_profile')
+
+    return render(request, 'admin/query_profile.html', {
+        **admin.site.each_context(request),
+        'title': "Query profile",
+        'rows': profiling.store.summary(),
+        'window': profiling.QUERY_PROFILER_WINDOW,
+        'threshold': profiling.QUERY_PROFILER_REPEAT_THRESHOLD,
+        'slow_ms': profiling.QUERY_PROFILER_SLOW_MS,
+    })
+
+
+def metrics_view(request):
+    # Scraped from the host itself; the load balancer never forwards here.
+    if request.META.get('REMOTE_ADDR') not in METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@require_GET
+@staff_member_required
+async def kitchen_feed(request):
+    # EventSource sends Last-Event-ID on reconnect; ?since= seeds a fresh screen.
+    cursor = request.headers.get('Last-Event-ID') or request.GET.get('since')
+    if cursor is not None:
+        try:
+            cursor = int(cursor)
+        except ValueError:
+            return HttpResponse("Invalid cursor.", status=400)
+
+    # WSGI would buffer the endless async stream in a worker thread and never send a byte.
+    events = kitchen.stream(cursor) if settings.CANTEEN_ASGI else kitchen.poll(cursor)
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
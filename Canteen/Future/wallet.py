@@ -0,0 +1,80 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from . import versions
+from .models import Employee, WalletSnapshot, WalletTransaction
+
+CENTS = Decimal('0.01')
+
+
+def record(employee, amount, kind, order=None, note=''):
+    return WalletTransaction.objects.create(employee=employee, amount=amount, kind=kind, order=order, note=note)
+
+
+def adjust_balance(employee, amount, kind=WalletTransaction.TOPUP, note=''):
+    """Move ``employee.wallet_amount`` by ``amount`` without overwriting concurrent debits."""
+    with transaction.atomic():
+        Employee.objects.filter(pk=employee.pk).update(wallet_amount=F('wallet_amount') + amount)
+        txn = record(employee, amount, kind, note=note)
+        employee.refresh_from_db(fields=['wallet_amount'])
+        transaction.on_commit(lambda: versions.bump(f"employee:{employee.pk}"))
+    return txn
+
+
+def ledger_balances(employees=None):
+    """
+    Map employee id to ``(wallet_amount, ledger_balance, last_transaction_id)``.
+
+    The ledger balance is the latest snapshot plus the transactions after
+    it, computed for every employee in a single query.
+    """
+    latest = WalletSnapshot.objects.filter(employee=OuterRef('pk')).order_by('-last_transaction_id')
+    tail = (
+        WalletTransaction.objects
+        .filter(employee=OuterRef('pk'), id__gt=OuterRef('snapshot_txn'))
+        .values('employee')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    last_txn = (
+        WalletTransaction.objects
+        .filter(employee=OuterRef('pk'))
+        .order_by('-id')
+        .values('id')[:1]
+    )
+    employees = (employees if employees is not None else Employee.objects.all()).annotate(
+        snapshot_balance=Coalesce(Subquery(latest.values('balance')[:1]), Value(Decimal('0.00'))),
+        snapshot_txn=Coalesce(Subquery(latest.values('last_transaction_id')[:1]), Value(0)),
+        tail_total=Coalesce(Subquery(tail), Value(Decimal('0.00'))),
+        last_txn=Coalesce(Subquery(last_txn), F('snapshot_txn')),
+    )
+
+    balances = {}
+    for row in employees.values('id', 'wallet_amount', 'snapshot_balance', 'tail_total', 'last_txn'):
+        ledger = (Decimal(row['snapshot_balance']) + Decimal(row['tail_total'])).quantize(CENTS)
+        balances[row['id']] = (Decimal(row['wallet_amount']).quantize(CENTS), ledger, row['last_txn'])
+    return balances
+
+
+def ledger_balance(employee):
+    return ledger_balances(Employee.objects.filter(pk=employee.pk))[employee.pk][1]
+
+
+def reconcile(snapshot=False):
+    """
+    Compare every wallet against its ledger; returns ``{employee_id: (wallet, ledger)}`` for mismatches.
+
+    With ``snapshot`` a fresh snapshot is written for each wallet that
+    agrees, so the next balance read only has to sum a short tail.
+    """
+    mismatches, snapshots = {}, []
+    for employee_id, (wallet_amount, ledger, last_txn) in ledger_balances().items():
+        if wallet_amount != ledger:
+            mismatches[employee_id] = (wallet_amount, ledger)
+        elif snapshot:
+            snapshots.append(WalletSnapshot(employee_id=employee_id, balance=ledger, last_transaction_id=last_txn))
+
+    WalletSnapshot.objects.bulk_create(snapshots, batch_size=500)
+    return mismatches